@@ -16,16 +16,34 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import folium
 from folium.plugins import HeatMap
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
 import os
+import re
 import logging
 from pathlib import Path
 
+# pyarrow: lector CSV multihilo (opcional, ver requirements.txt)
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+# orjson: parseo JSON en C directamente desde bytes (opcional)
+try:
+    import orjson
+    ORJSON_DISPONIBLE = True
+except ImportError:
+    ORJSON_DISPONIBLE = False
+
 # ══════════════════════════════════════════════════════════════════════════════
 # CONFIGURACIÓN DE LOGGING
 # ══════════════════════════════════════════════════════════════════════════════
@@ -57,7 +75,7 @@ st.set_page_config(
 # ══════════════════════════════════════════════════════════════════════════════
 # ESTILOS CSS PERSONALIZADOS (Tema oscuro estilo "Centro de Control")
 # ══════════════════════════════════════════════════════════════════════════════
-st.markdown("""
+CSS_PERSONALIZADO = """
 <style>
     /* ═══ IMPORTS DE FUENTES ═══ */
     @import url('https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@300;400;500;600;700&family=Inter:wght@300;400;500;600;700&display=swap');
@@ -157,6 +175,18 @@ st.markdown("""
         color: var(--color-text-muted);
     }
     
+    .metric-grid {
+        display: grid;
+        grid-template-columns: repeat(var(--metric-cols, 4), minmax(0, 1fr));
+        gap: 1rem;
+    }
+    
+    @media (max-width: 640px) {
+        .metric-grid {
+            grid-template-columns: 1fr;
+        }
+    }
+    
     /* ═══ TARJETAS ═══ */
     .card {
         background: var(--color-bg-card);
@@ -309,7 +339,22 @@ st.markdown("""
     footer {visibility: hidden;}
     .stDeployButton {display: none;}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+@st.cache_resource
+def css_compacto() -> str:
+    """
+    Versión compacta de CSS_PERSONALIZADO (sin comentarios ni sangrías).
+    Streamlit re-ejecuta el script en cada interacción y el bloque <style> se
+    reenvía al navegador en cada rerun: se compacta una vez por proceso.
+    """
+    css = re.sub(r'/\*.*?\*/', '', CSS_PERSONALIZADO, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};])\s*', r'\1', css).strip()
+
+
+st.markdown(css_compacto(), unsafe_allow_html=True)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # CONSTANTES Y CONFIGURACIÓN
@@ -332,6 +377,12 @@ BARRIOS_VALENCIA = {
     'Rascanya': {'lat': 39.4950, 'lon': -0.3800, 'poblacion': 52000},
 }
 
+# Misma información en arrays paralelos (un array por campo), para indexar
+# y repetir en bloque sin consultar el diccionario fila a fila
+BARRIO_NOMBRES = np.array(list(BARRIOS_VALENCIA))
+BARRIO_LATS = np.fromiter((c['lat'] for c in BARRIOS_VALENCIA.values()), np.float64, count=len(BARRIOS_VALENCIA))
+BARRIO_LONS = np.fromiter((c['lon'] for c in BARRIOS_VALENCIA.values()), np.float64, count=len(BARRIOS_VALENCIA))
+
 LIMITES_CONTAMINACION = {
     'NO2': {'bueno': 40, 'moderado': 100, 'alto': 200},
     'PM25': {'bueno': 15, 'moderado': 25, 'alto': 50},
@@ -339,6 +390,42 @@ LIMITES_CONTAMINACION = {
     'O3': {'bueno': 60, 'moderado': 120, 'alto': 180},
 }
 
+# Generador PCG64 compartido por los datos de demostración: cada columna se
+# sortea en una sola llamada vectorizada en lugar de un sorteo por fila
+RNG_DEMO = np.random.default_rng(42)
+
+# Umbrales "moderado" en el orden de calcular_ica (NO2, PM25, PM10, O3)
+LIMITES_ICA = np.array([
+    LIMITES_CONTAMINACION[c]['moderado'] for c in ('NO2', 'PM25', 'PM10', 'O3')
+], dtype=np.float64)
+
+# Tipos explícitos al leer CSV: evita la inferencia columna a columna y
+# reduce memoria (category para claves de agrupación, float32 para medidas)
+DTYPES_CONTAMINACION = {
+    'barrio': 'category',
+    'NO2': 'float32',
+    'PM25': 'float32',
+    'PM10': 'float32',
+    'O3': 'float32',
+    'lat': 'float32',
+    'lon': 'float32',
+}
+
+DTYPES_METEOROLOGIA = {
+    'temperatura': 'float32',
+    'humedad': 'float32',
+    'precipitacion': 'float32',
+    'presion': 'float32',
+    'viento_velocidad': 'float32',
+    'viento_direccion': 'category',
+}
+
+DTYPES_TRAFICO = {
+    'ubicacion': 'category',
+    'velocidad_media': 'float32',
+    'ocupacion': 'float32',
+}
+
 COLORES = {
     'bueno': '#10b981',
     'moderado': '#f59e0b',
@@ -348,10 +435,114 @@ COLORES = {
     'secondary': '#64748b',
 }
 
+# Por encima de este nº de puntos la serie temporal se agrega a 15 minutos
+MAX_PUNTOS_SERIE = 2000
+
+# Plantilla Plotly del dashboard: plotly_dark con fondo transparente y
+# rejilla tenue. pio.templates es global al proceso, así que se registra una
+# sola vez y no en cada rerun del script
+PLANTILLA_PLOTLY = 'data_detective'
+if PLANTILLA_PLOTLY not in pio.templates:
+    _plantilla = go.layout.Template(pio.templates['plotly_dark'])
+    _plantilla.layout.update(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(gridcolor='rgba(148, 163, 184, 0.1)'),
+        yaxis=dict(gridcolor='rgba(148, 163, 184, 0.1)'),
+    )
+    pio.templates[PLANTILLA_PLOTLY] = _plantilla
+
+# Niveles ordenados y umbrales por contaminante para la clasificación
+# vectorizada (np.searchsorted) equivalente a obtener_nivel_calidad
+NIVELES_CALIDAD = np.array(['bueno', 'moderado', 'alto', 'muy_alto'])
+COLORES_NIVEL = np.array([COLORES[n] for n in NIVELES_CALIDAD])
+FLECHAS_TENDENCIA = np.array(['↓', '→', '↑'])
+
+UMBRALES_NIVEL = {
+    c: np.array([l['bueno'], l['moderado'], l['alto']], dtype=np.float32)
+    for c, l in LIMITES_CONTAMINACION.items()
+}
+
+# Intensidad de tráfico (veh/h): < 1200 fluido, < 1800 denso, resto congestionado
+UMBRALES_INTENSIDAD = np.array([1200, 1800])
+COLORES_INTENSIDAD = np.array([COLORES['bueno'], COLORES['moderado'], COLORES['alto']])
+
 # ══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES DE CARGA DE DATOS
 # ══════════════════════════════════════════════════════════════════════════════
-@st.cache_data(ttl=300)  # Cache de 5 minutos
+def ordenar_por_fecha(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garantiza 'fecha' ascendente (orden estable) para que ultimas_horas()
+    pueda cortar con searchsorted. Sin coste si ya viene ordenado.
+    """
+    if df['fecha'].is_monotonic_increasing:
+        return df
+    return df.sort_values('fecha', kind='stable', ignore_index=True)
+
+
+def ultimas_horas(df: pd.DataFrame, horas: int) -> pd.DataFrame:
+    """
+    Filas con fecha >= (fecha más reciente - `horas`).
+    Requiere 'fecha' ordenada (los loaders la ordenan): el corte se localiza
+    con searchsorted en O(log n) y se devuelve un slice, sin máscara booleana.
+    """
+    if df.empty:
+        return df
+    fechas = df['fecha'].to_numpy()
+    corte = fechas[-1] - np.timedelta64(horas, 'h')
+    return df.iloc[fechas.searchsorted(corte, side='left'):]
+
+
+def tramo_horas(df: pd.DataFrame, desde: int, hasta: int) -> pd.DataFrame:
+    """
+    Filas con fecha en [última - `desde` h, última - `hasta` h), p.ej.
+    tramo_horas(df, 2, 1) es la hora anterior a la última. Mismo requisito
+    que ultimas_horas(): 'fecha' ordenada.
+    """
+    if df.empty:
+        return df
+    fechas = df['fecha'].to_numpy()
+    ultima = fechas[-1]
+    inicio, fin = fechas.searchsorted(
+        [ultima - np.timedelta64(desde, 'h'), ultima - np.timedelta64(hasta, 'h')], side='left'
+    )
+    return df.iloc[inicio:fin]
+
+
+def leer_csv_limpio(ruta: Path, dtype: dict = None) -> pd.DataFrame:
+    """
+    Lee un CSV de 3.DATOS_LIMPIOS parseando 'fecha'.
+    Usa el motor de PyArrow (parseo multihilo en C++) si está instalado.
+
+    Con PyArrow disponible mantiene además una copia Parquet junto al CSV
+    (misma ruta, extensión .parquet) que se reutiliza mientras sea más
+    reciente que el CSV: los arranques en frío se ahorran el parseo de texto
+    y de fechas, y los tipos (category, float32) se conservan.
+    """
+    ruta_pq = ruta.with_suffix('.parquet')
+    if PYARROW_DISPONIBLE and ruta_pq.exists() and ruta_pq.stat().st_mtime >= ruta.stat().st_mtime:
+        df = pd.read_parquet(ruta_pq, engine='pyarrow')
+        if dtype:
+            # No-op si los tipos ya coinciden; corrige copias de versiones anteriores
+            df = df.astype({col: tipo for col, tipo in dtype.items() if col in df.columns})
+        return ordenar_por_fecha(df)
+
+    engine = 'pyarrow' if PYARROW_DISPONIBLE else 'c'
+    df = ordenar_por_fecha(pd.read_csv(ruta, engine=engine, parse_dates=['fecha'], dtype=dtype))
+
+    if PYARROW_DISPONIBLE:
+        try:
+            # Escritura atómica: otra sesión nunca lee un Parquet a medias
+            ruta_tmp = ruta_pq.with_suffix('.parquet.tmp')
+            df.to_parquet(ruta_tmp, engine='pyarrow', compression='zstd', index=False)
+            ruta_tmp.replace(ruta_pq)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la caché Parquet {ruta_pq.name}: {e}")
+
+    return df
+
+
+@st.cache_data(ttl=900, show_spinner='Cargando contaminación...')  # Cache de 15 minutos
 def cargar_datos_contaminacion():
     """
     Carga datos de contaminación desde archivos procesados.
@@ -361,7 +552,7 @@ def cargar_datos_contaminacion():
         # Intentar cargar datos reales
         ruta = Path('3.DATOS_LIMPIOS/contaminacion_limpio.csv')
         if ruta.exists():
-            df = pd.read_csv(ruta, parse_dates=['fecha'])
+            df = leer_csv_limpio(ruta, dtype=DTYPES_CONTAMINACION)
             logger.info(f"Datos de contaminación cargados: {len(df)} registros")
             return df
     except Exception as e:
@@ -370,32 +561,34 @@ def cargar_datos_contaminacion():
     # Generar datos de demostración
     logger.info("Generando datos de demostración para contaminación")
     fechas = pd.date_range(end=datetime.now(), periods=24*7, freq='H')
-    datos = []
-    
-    for barrio, coords in BARRIOS_VALENCIA.items():
-        for fecha in fechas:
-            # Simular variación horaria (más contaminación en horas punta)
-            hora = fecha.hour
-            factor_hora = 1 + 0.5 * np.sin((hora - 8) * np.pi / 12) if 6 <= hora <= 22 else 0.7
-            
-            # Variación por barrio (algunos más contaminados)
-            factor_barrio = 1.2 if barrio in ['L\'Eixample', 'Quatre Carreres'] else 1.0
-            
-            datos.append({
-                'fecha': fecha,
-                'barrio': barrio,
-                'NO2': max(0, np.random.normal(35 * factor_hora * factor_barrio, 10)),
-                'PM25': max(0, np.random.normal(20 * factor_hora * factor_barrio, 8)),
-                'PM10': max(0, np.random.normal(30 * factor_hora * factor_barrio, 12)),
-                'O3': max(0, np.random.normal(50 * (2 - factor_hora), 15)),  # O3 inverso
-                'lat': coords['lat'] + np.random.normal(0, 0.005),
-                'lon': coords['lon'] + np.random.normal(0, 0.005),
-            })
-    
-    return pd.DataFrame(datos)
+    n_fechas = len(fechas)
+    n_barrios = len(BARRIO_NOMBRES)
+    n = n_barrios * n_fechas
+
+    # Una fila por (barrio, fecha), en el mismo orden que el bucle anidado original
+
+    # Simular variación horaria (más contaminación en horas punta)
+    hora = fechas.hour.values
+    factor_hora = np.where((hora >= 6) & (hora <= 22), 1 + 0.5 * np.sin((hora - 8) * np.pi / 12), 0.7)
+    factor_hora = np.tile(factor_hora, n_barrios)
+
+    # Variación por barrio (algunos más contaminados)
+    factor_barrio = np.where(np.isin(BARRIO_NOMBRES, ['L\'Eixample', 'Quatre Carreres']), 1.2, 1.0)
+    factor_barrio = np.repeat(factor_barrio, n_fechas)
 
+    return pd.DataFrame({
+        'fecha': np.tile(fechas.values, n_barrios),
+        'barrio': np.repeat(BARRIO_NOMBRES, n_fechas),
+        'NO2': np.clip(RNG_DEMO.normal(35 * factor_hora * factor_barrio, 10, n), 0, None),
+        'PM25': np.clip(RNG_DEMO.normal(20 * factor_hora * factor_barrio, 8, n), 0, None),
+        'PM10': np.clip(RNG_DEMO.normal(30 * factor_hora * factor_barrio, 12, n), 0, None),
+        'O3': np.clip(RNG_DEMO.normal(50 * (2 - factor_hora), 15, n), 0, None),  # O3 inverso
+        'lat': np.repeat(BARRIO_LATS, n_fechas) + RNG_DEMO.normal(0, 0.005, n),
+        'lon': np.repeat(BARRIO_LONS, n_fechas) + RNG_DEMO.normal(0, 0.005, n),
+    }).astype(DTYPES_CONTAMINACION).pipe(ordenar_por_fecha)
 
-@st.cache_data(ttl=600)  # Cache de 10 minutos
+
+@st.cache_data(ttl=600, show_spinner='Cargando meteorología...')  # Cache de 10 minutos
 def cargar_datos_meteorologia():
     """
     Carga datos meteorológicos desde archivos procesados.
@@ -404,7 +597,7 @@ def cargar_datos_meteorologia():
     try:
         ruta = Path('3.DATOS_LIMPIOS/meteorologia_limpio.csv')
         if ruta.exists():
-            df = pd.read_csv(ruta, parse_dates=['fecha'])
+            df = leer_csv_limpio(ruta, dtype=DTYPES_METEOROLOGIA)
             logger.info(f"Datos meteorológicos cargados: {len(df)} registros")
             return df
     except Exception as e:
@@ -413,27 +606,28 @@ def cargar_datos_meteorologia():
     # Generar datos de demostración
     logger.info("Generando datos de demostración para meteorología")
     fechas = pd.date_range(end=datetime.now(), periods=24*7, freq='H')
-    
-    datos = []
-    for fecha in fechas:
-        hora = fecha.hour
-        # Temperatura con variación diaria
-        temp_base = 15 + 5 * np.sin((hora - 6) * np.pi / 12)
-        
-        datos.append({
-            'fecha': fecha,
-            'temperatura': temp_base + np.random.normal(0, 2),
-            'humedad': 60 + np.random.normal(0, 15),
-            'precipitacion': max(0, np.random.exponential(0.5) if np.random.random() > 0.8 else 0),
-            'presion': 1013 + np.random.normal(0, 5),
-            'viento_velocidad': max(0, np.random.normal(12, 5)),
-            'viento_direccion': np.random.choice(['N', 'NE', 'E', 'SE', 'S', 'SO', 'O', 'NO']),
-        })
-    
-    return pd.DataFrame(datos)
+    n = len(fechas)
+    
+    # Temperatura con variación diaria
+    hora = fechas.hour.values
+    temp_base = 15 + 5 * np.sin((hora - 6) * np.pi / 12)
+    
+    # Todo el ruido gaussiano en un único sorteo (una columna por variable)
+    ruido = RNG_DEMO.standard_normal((n, 4))
+    llueve = RNG_DEMO.random(n) > 0.8
+    
+    return pd.DataFrame({
+        'fecha': fechas,
+        'temperatura': temp_base + 2 * ruido[:, 0],
+        'humedad': 60 + 15 * ruido[:, 1],
+        'precipitacion': np.where(llueve, RNG_DEMO.exponential(0.5, n), 0.0),
+        'presion': 1013 + 5 * ruido[:, 2],
+        'viento_velocidad': np.maximum(0, 12 + 5 * ruido[:, 3]),
+        'viento_direccion': RNG_DEMO.choice(['N', 'NE', 'E', 'SE', 'S', 'SO', 'O', 'NO'], size=n),
+    }).astype(DTYPES_METEOROLOGIA)
 
 
-@st.cache_data(ttl=300)
+@st.cache_data(ttl=300, show_spinner='Cargando tráfico...')  # Cache de 5 minutos
 def cargar_datos_trafico():
     """
     Carga datos de tráfico desde archivos procesados.
@@ -441,7 +635,7 @@ def cargar_datos_trafico():
     try:
         ruta = Path('3.DATOS_LIMPIOS/trafico_limpio.csv')
         if ruta.exists():
-            df = pd.read_csv(ruta, parse_dates=['fecha'])
+            df = leer_csv_limpio(ruta, dtype=DTYPES_TRAFICO)
             logger.info(f"Datos de tráfico cargados: {len(df)} registros")
             return df
     except Exception as e:
@@ -456,32 +650,53 @@ def cargar_datos_trafico():
         'C/ Colón', 'Av. del Cid', 'Ronda Norte', 'V-30'
     ]
     
-    datos = []
-    for fecha in fechas:
-        hora = fecha.hour
-        dia_semana = fecha.weekday()
-        
-        # Factor hora punta
-        es_hora_punta = hora in [8, 9, 14, 18, 19, 20]
-        factor_hora = 1.8 if es_hora_punta else (0.3 if hora < 6 else 1.0)
-        
-        # Factor fin de semana
-        factor_finde = 0.6 if dia_semana >= 5 else 1.0
-        
-        for ubicacion in ubicaciones:
-            intensidad_base = 1500 if 'Av.' in ubicacion else 800
-            datos.append({
-                'fecha': fecha,
-                'ubicacion': ubicacion,
-                'intensidad': int(intensidad_base * factor_hora * factor_finde + np.random.normal(0, 200)),
-                'velocidad_media': max(10, 45 - 20 * (factor_hora - 1) + np.random.normal(0, 5)),
-                'ocupacion': min(100, max(0, 30 * factor_hora + np.random.normal(0, 10))),
-            })
+    n_fechas = len(fechas)
+    n_ubicaciones = len(ubicaciones)
+    n = n_fechas * n_ubicaciones
+    
+    # Una fila por (fecha, ubicación), en el mismo orden que el bucle anidado original
+    hora = np.repeat(fechas.hour.values, n_ubicaciones)
+    dia_semana = np.repeat(fechas.weekday.values, n_ubicaciones)
+    
+    # Factor hora punta
+    es_hora_punta = np.isin(hora, [8, 9, 14, 18, 19, 20])
+    factor_hora = np.where(es_hora_punta, 1.8, np.where(hora < 6, 0.3, 1.0))
+    
+    # Factor fin de semana
+    factor_finde = np.where(dia_semana >= 5, 0.6, 1.0)
+    
+    intensidad_base = np.tile([1500 if 'Av.' in u else 800 for u in ubicaciones], n_fechas)
+    ruido = RNG_DEMO.standard_normal((n, 3))
     
-    return pd.DataFrame(datos)
+    # La intensidad simulada siempre es entera; en el CSV real puede traer huecos
+    return pd.DataFrame({
+        'fecha': np.repeat(fechas.values, n_ubicaciones),
+        'ubicacion': np.tile(ubicaciones, n_fechas),
+        'intensidad': intensidad_base * factor_hora * factor_finde + 200 * ruido[:, 0],
+        'velocidad_media': np.maximum(10, 45 - 20 * (factor_hora - 1) + 5 * ruido[:, 1]),
+        'ocupacion': np.clip(30 * factor_hora + 10 * ruido[:, 2], 0, 100),
+    }).astype({**DTYPES_TRAFICO, 'intensidad': 'int32'})
+
+
+def cargar_datos_en_paralelo(*cargadores):
+    """
+    Ejecuta cargadores independientes en un pool de hilos y devuelve sus
+    resultados en el mismo orden. La lectura de CSV/Parquet libera el GIL,
+    así que en frío el tiempo total es el del cargador más lento y no la
+    suma; con la caché caliente cada llamada vuelve al instante.
+    """
+    ctx = get_script_run_ctx()
+
+    def ejecutar(cargador):
+        # Los hilos del pool necesitan el contexto de la sesión para st.cache_data
+        add_script_run_ctx(ctx=ctx)
+        return cargador()
+
+    with ThreadPoolExecutor(max_workers=len(cargadores)) as pool:
+        return list(pool.map(ejecutar, cargadores))
 
 
-@st.cache_data(ttl=3600)  # Cache de 1 hora
+@st.cache_data(ttl=3600, show_spinner='Cargando eventos...')  # Cache de 1 hora
 def cargar_eventos():
     """
     Carga eventos desde archivos procesados.
@@ -489,8 +704,11 @@ def cargar_eventos():
     try:
         ruta = Path('1.DATOS_EN_CRUDO/eventos/eventos_clasificados.json')
         if ruta.exists():
-            with open(ruta, 'r', encoding='utf-8') as f:
-                eventos = json.load(f)
+            if ORJSON_DISPONIBLE:
+                eventos = orjson.loads(ruta.read_bytes())
+            else:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    eventos = json.load(f)
             logger.info(f"Eventos cargados: {len(eventos)} registros")
             return pd.DataFrame(eventos)
     except Exception as e:
@@ -598,18 +816,124 @@ def obtener_color_nivel(nivel: str) -> str:
     return COLORES.get(nivel, COLORES['secondary'])
 
 
-def calcular_ica(no2: float, pm25: float, pm10: float, o3: float) -> int:
+def indices_nivel_calidad(valores, contaminante: str) -> np.ndarray:
+    """
+    Versión vectorizada de obtener_nivel_calidad: devuelve, para cada valor,
+    el índice en NIVELES_CALIDAD / COLORES_NIVEL (un único np.searchsorted).
+    """
+    umbrales = UMBRALES_NIVEL.get(contaminante, UMBRALES_NIVEL['NO2'])
+    # side='left' respeta los límites inclusivos (valor <= umbral)
+    return np.searchsorted(umbrales, valores, side='left')
+
+
+def calcular_ica(no2, pm25, pm10, o3):
     """
     Calcula el Índice de Calidad del Aire simplificado.
     En producción, usar la fórmula oficial.
+
+    Acepta escalares (devuelve int) o arrays NumPy del mismo tamaño, p.ej.
+    columnas de un DataFrame con .to_numpy() (devuelve un array int32
+    calculado en una sola pasada vectorizada).
     """
+    valores = np.array(np.broadcast_arrays(no2, pm25, pm10, o3), dtype=np.float64)
+    limites = LIMITES_ICA.reshape((4,) + (1,) * (valores.ndim - 1))
+    
     # Normalización simple (0-100 por contaminante, luego máximo)
-    ica_no2 = min(100, (no2 / LIMITES_CONTAMINACION['NO2']['moderado']) * 50)
-    ica_pm25 = min(100, (pm25 / LIMITES_CONTAMINACION['PM25']['moderado']) * 50)
-    ica_pm10 = min(100, (pm10 / LIMITES_CONTAMINACION['PM10']['moderado']) * 50)
-    ica_o3 = min(100, (o3 / LIMITES_CONTAMINACION['O3']['moderado']) * 50)
+    ica = np.fmin(100, valores / limites * 50).max(axis=0)
+    
+    if ica.ndim == 0:
+        return int(ica)
+    return ica.astype(np.int32)
+
+
+def version_datos(df: pd.DataFrame) -> int:
+    """
+    Huella O(1) de un DataFrame cargado (nº de filas + primera/última fecha).
+    Cambia cada vez que un loader cacheado vuelve a leer o generar los datos.
+    """
+    if df.empty:
+        return 0
+    return hash((len(df), df['fecha'].iat[0].value, df['fecha'].iat[-1].value))
+
+
+def medias_por_grupo(df: pd.DataFrame, clave: str, columnas: list) -> pd.DataFrame:
+    """
+    Media de `columnas` por `clave` (columna `clave` + una por variable).
+    Con `clave` categórica ('barrio', 'ubicacion') usa np.bincount sobre los
+    códigos en lugar de un groupby: con ~10 grupos el coste fijo del groupby
+    domina. Mismo resultado que groupby(observed=True).mean(): ignora NaN y
+    devuelve solo los grupos presentes, en el orden de las categorías.
+    """
+    grupos = df[clave]
+    if not isinstance(grupos.dtype, pd.CategoricalDtype):
+        return df.groupby(clave)[columnas].mean().reset_index()
+    
+    codigos = grupos.cat.codes.to_numpy()
+    n = len(grupos.cat.categories)
+    con_grupo = codigos >= 0
+    presentes = np.bincount(codigos[con_grupo], minlength=n) > 0
+    
+    resultado = {clave: grupos.cat.categories[presentes]}
+    for col in columnas:
+        valores = df[col].to_numpy(dtype=np.float64)
+        validos = con_grupo & ~np.isnan(valores)
+        sumas = np.bincount(codigos[validos], weights=valores[validos], minlength=n)
+        conteos = np.bincount(codigos[validos], minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            resultado[col] = (sumas / conteos)[presentes]
+    
+    return pd.DataFrame(resultado)
+
+
+def filtrar_barrio(df: pd.DataFrame, barrio_filtro: str) -> pd.DataFrame:
+    """Filtra por barrio salvo que el filtro sea 'Todos'."""
+    if barrio_filtro == 'Todos':
+        return df
+    return df[df['barrio'] == barrio_filtro]
+
+
+@st.cache_data(ttl=300)
+def metricas_contaminacion(_df: pd.DataFrame, barrio_filtro: str = 'Todos',
+                           data_version: int = 0) -> dict:
+    """
+    Medias de la última hora y tabla por barrio de la sección de
+    contaminación. `_df` no se hashea: la clave es (barrio_filtro,
+    data_version), así que cambiar de pestaña o rerun no recalcula nada.
+    """
+    df_barrio = filtrar_barrio(_df, barrio_filtro)
+    df_reciente = ultimas_horas(df_barrio, 1)
+    
+    tabla = medias_por_grupo(df_reciente, 'barrio', ['NO2', 'PM25', 'O3']).round(1)
+    tabla['Estado'] = NIVELES_CALIDAD[indices_nivel_calidad(tabla['NO2'].to_numpy(), 'NO2')]
     
-    return int(max(ica_no2, ica_pm25, ica_pm10, ica_o3))
+    # Tendencia: NO2 de la última hora frente a la hora anterior (→ si no
+    # cambia al redondear o no hay datos previos del barrio)
+    previas = medias_por_grupo(tramo_horas(df_barrio, 2, 1), 'barrio', ['NO2']).set_index('barrio')['NO2']
+    diferencia = tabla['NO2'].to_numpy() - previas.reindex(tabla['barrio']).round(1).to_numpy()
+    tabla['Tendencia'] = FLECHAS_TENDENCIA[np.nan_to_num(np.sign(diferencia)).astype(int) + 1]
+    
+    # Una sola reducción sobre el bloque float32 en lugar de cuatro .mean()
+    medias = df_reciente[['NO2', 'PM25', 'O3', 'PM10']].mean()
+    
+    return {**medias.to_dict(), 'tabla': tabla}
+
+
+@st.cache_data(ttl=600)
+def metricas_meteorologia(_df: pd.DataFrame, data_version: int = 0) -> dict:
+    """Medias meteorológicas de la última hora (clave: data_version)."""
+    df_actual = ultimas_horas(_df, 1)
+    return df_actual[['humedad', 'presion', 'viento_velocidad', 'temperatura']].mean().to_dict()
+
+
+@st.cache_data(ttl=300)
+def metricas_trafico(_df: pd.DataFrame, data_version: int = 0) -> dict:
+    """Medias de tráfico de la última hora y media por vía (clave: data_version)."""
+    df_reciente = ultimas_horas(_df, 1)
+    medias = df_reciente[['intensidad', 'velocidad_media', 'ocupacion']].mean()
+    return {
+        **medias.to_dict(),
+        'vias': medias_por_grupo(df_reciente, 'ubicacion', ['intensidad']).sort_values('intensidad'),
+    }
 
 
 def crear_mapa_calor(df: pd.DataFrame, variable: str = 'NO2') -> folium.Map:
@@ -621,9 +945,9 @@ def crear_mapa_calor(df: pd.DataFrame, variable: str = 'NO2') -> folium.Map:
     )
     
     # Preparar datos para el heatmap
-    datos_recientes = df[df['fecha'] >= df['fecha'].max() - timedelta(hours=1)]
-    heat_data = [[row['lat'], row['lon'], row[variable]] for _, row in datos_recientes.iterrows()]
-    
+    datos_recientes = ultimas_horas(df, 1)
+    heat_data = datos_recientes[['lat', 'lon', variable]].to_numpy(dtype=np.float64, copy=False).tolist()
+
     # Añadir capa de calor
     HeatMap(
         heat_data,
@@ -633,16 +957,23 @@ def crear_mapa_calor(df: pd.DataFrame, variable: str = 'NO2') -> folium.Map:
         gradient={0.2: 'blue', 0.4: 'lime', 0.6: 'yellow', 0.8: 'orange', 1: 'red'}
     ).add_to(m)
     
-    # Añadir marcadores de estaciones
-    for barrio, coords in BARRIOS_VALENCIA.items():
-        datos_barrio = datos_recientes[datos_recientes['barrio'] == barrio]
-        if not datos_barrio.empty:
-            valor = datos_barrio[variable].mean()
-            nivel = obtener_nivel_calidad(valor, variable)
-            color = obtener_color_nivel(nivel)
+    # Añadir marcadores de estaciones (una sola agrupación para todos los barrios)
+    medias_barrio = (
+        datos_recientes.groupby('barrio', observed=True)[variable].mean()
+        .reindex(BARRIO_NOMBRES)
+        .to_numpy()
+    )
+    idx_niveles = indices_nivel_calidad(medias_barrio, variable)
+    for barrio, lat, lon, valor, idx in zip(
+        BARRIO_NOMBRES.tolist(), BARRIO_LATS.tolist(), BARRIO_LONS.tolist(),
+        medias_barrio.tolist(), idx_niveles.tolist()
+    ):
+        if not np.isnan(valor):
+            nivel = NIVELES_CALIDAD[idx]
+            color = COLORES_NIVEL[idx]
             
             folium.CircleMarker(
-                location=[coords['lat'], coords['lon']],
+                location=[lat, lon],
                 radius=10,
                 color=color,
                 fill=True,
@@ -654,15 +985,37 @@ def crear_mapa_calor(df: pd.DataFrame, variable: str = 'NO2') -> folium.Map:
     return m
 
 
-def crear_grafico_evolucion(df: pd.DataFrame, variable: str = 'NO2') -> go.Figure:
-    """Crea un gráfico de evolución temporal."""
-    df_agrupado = df.groupby('fecha')[variable].mean().reset_index()
+@st.cache_resource(ttl=300)
+def mapa_calor_html(_df: pd.DataFrame, variable: str = 'NO2',
+                    barrio_filtro: str = 'Todos', data_version: int = 0) -> str:
+    """
+    HTML completo del mapa de calor, construido y serializado una sola vez.
+    Se comparte entre sesiones: `_df` no se hashea y la clave de caché es
+    (variable, barrio_filtro, data_version).
+    """
+    return crear_mapa_calor(filtrar_barrio(_df, barrio_filtro), variable).get_root().render()
+
+
+@st.cache_resource(ttl=300)
+def crear_grafico_evolucion(_df: pd.DataFrame, variable: str = 'NO2',
+                            barrio_filtro: str = 'Todos', data_version: int = 0) -> go.Figure:
+    """
+    Crea un gráfico de evolución temporal.
+    Igual que mapa_calor_html: `_df` no se hashea y la clave de caché es
+    (variable, barrio_filtro, data_version).
+    """
+    df = filtrar_barrio(_df, barrio_filtro)
+    # Serie indexada por fecha (ya ordenada por groupby): sin reset_index
+    serie = df.groupby('fecha')[variable].mean()
+    if len(serie) > MAX_PUNTOS_SERIE:
+        serie = serie.resample('15min').mean().dropna()
     
     fig = go.Figure()
     
-    fig.add_trace(go.Scatter(
-        x=df_agrupado['fecha'],
-        y=df_agrupado[variable],
+    # WebGL y arrays NumPy: Plotly no convierte la serie a listas
+    fig.add_trace(go.Scattergl(
+        x=serie.index.to_numpy(),
+        y=serie.to_numpy(),
         mode='lines',
         name=variable,
         line=dict(color=COLORES['bueno'], width=2),
@@ -681,21 +1034,11 @@ def crear_grafico_evolucion(df: pd.DataFrame, variable: str = 'NO2') -> go.Figur
     )
     
     fig.update_layout(
-        template='plotly_dark',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
+        template=PLANTILLA_PLOTLY,
         margin=dict(l=20, r=20, t=30, b=20),
         height=300,
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(148, 163, 184, 0.1)',
-            title=None
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(148, 163, 184, 0.1)',
-            title=f'{variable} (µg/m³)'
-        ),
+        xaxis=dict(showgrid=True, title=None),
+        yaxis=dict(showgrid=True, title=f'{variable} (µg/m³)'),
         showlegend=False
     )
     
@@ -704,17 +1047,13 @@ def crear_grafico_evolucion(df: pd.DataFrame, variable: str = 'NO2') -> go.Figur
 
 def crear_grafico_barrios(df: pd.DataFrame) -> go.Figure:
     """Crea un gráfico de barras horizontales por barrio."""
-    df_reciente = df[df['fecha'] >= df['fecha'].max() - timedelta(hours=24)]
-    df_barrios = df_reciente.groupby('barrio').agg({
-        'NO2': 'mean',
-        'PM25': 'mean',
-        'O3': 'mean'
-    }).round(1).reset_index()
+    df_reciente = ultimas_horas(df, 24)
+    df_barrios = medias_por_grupo(df_reciente, 'barrio', ['NO2', 'PM25', 'O3']).round(1)
     
     df_barrios = df_barrios.sort_values('NO2', ascending=True)
     
     # Asignar colores según nivel
-    colores = [obtener_color_nivel(obtener_nivel_calidad(v, 'NO2')) for v in df_barrios['NO2']]
+    colores = COLORES_NIVEL[indices_nivel_calidad(df_barrios['NO2'].to_numpy(), 'NO2')].tolist()
     
     fig = go.Figure()
     
@@ -729,50 +1068,141 @@ def crear_grafico_barrios(df: pd.DataFrame) -> go.Figure:
     ))
     
     fig.update_layout(
-        template='plotly_dark',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
+        template=PLANTILLA_PLOTLY,
         margin=dict(l=20, r=60, t=30, b=20),
         height=400,
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(148, 163, 184, 0.1)',
-            title='NO₂ (µg/m³)'
-        ),
-        yaxis=dict(
-            showgrid=False,
-            title=None
-        ),
+        xaxis=dict(showgrid=True, title='NO₂ (µg/m³)'),
+        yaxis=dict(showgrid=False, title=None),
         showlegend=False
     )
     
     return fig
 
 
+@st.cache_resource(ttl=300)
+def crear_grafico_vias(_df_vias: pd.DataFrame, data_version: int = 0) -> go.Figure:
+    """
+    Crea el gráfico de barras de intensidad media por vía.
+    `_df_vias` (salida de metricas_trafico) no se hashea: clave data_version.
+    """
+    df_vias = _df_vias
+    
+    idx_intensidad = np.searchsorted(UMBRALES_INTENSIDAD, df_vias['intensidad'].to_numpy(), side='right')
+    colores_vias = COLORES_INTENSIDAD[idx_intensidad].tolist()
+    
+    fig = go.Figure(go.Bar(
+        y=df_vias['ubicacion'],
+        x=df_vias['intensidad'],
+        orientation='h',
+        marker_color=colores_vias,
+        text=df_vias['intensidad'].apply(lambda x: f'{x:,.0f}'),
+        textposition='outside'
+    ))
+    
+    fig.update_layout(
+        template=PLANTILLA_PLOTLY,
+        margin=dict(l=20, r=80, t=20, b=20),
+        height=300,
+        xaxis=dict(showgrid=True, title='Vehículos/hora'),
+        yaxis=dict(showgrid=False, title=None),
+        showlegend=False
+    )
+    
+    return fig
+
+
+@st.cache_resource
+def crear_grafico_correlacion() -> go.Figure:
+    """
+    Crea el gráfico de correlación eventos-contaminación (2025).
+    Sus datos son fijos: se construye una vez por proceso.
+    """
+    meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+    valores_base = [42, 40, 45, 38, 35, 32, 30, 28, 35, 40, 42, 45]
+    valores_eventos = [50, 42, 85, 40, 36, 34, 55, 30, 38, 52, 44, 55]
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=meses,
+        y=valores_eventos,
+        name='Con eventos',
+        marker_color=[COLORES['alto'] if v > 60 else COLORES['moderado'] for v in valores_eventos]
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=meses,
+        y=valores_base,
+        name='Media base',
+        mode='lines+markers',
+        line=dict(color=COLORES['secondary'], dash='dash'),
+        marker=dict(size=6)
+    ))
+    
+    fig.update_layout(
+        template=PLANTILLA_PLOTLY,
+        margin=dict(l=20, r=20, t=30, b=20),
+        height=300,
+        xaxis=dict(showgrid=False, title=None),
+        yaxis=dict(showgrid=True, title='NO₂ (µg/m³)'),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1),
+        barmode='group'
+    )
+    
+    # Anotaciones de eventos
+    fig.add_annotation(x='Mar', y=85, text='Fallas', showarrow=True, arrowhead=2, ax=0, ay=-30, font=dict(size=10, color='#ef4444'))
+    fig.add_annotation(x='Jul', y=55, text='Feria', showarrow=True, arrowhead=2, ax=0, ay=-30, font=dict(size=10, color='#f59e0b'))
+    fig.add_annotation(x='Oct', y=52, text='9 Oct', showarrow=True, arrowhead=2, ax=0, ay=-30, font=dict(size=10, color='#f59e0b'))
+    
+    return fig
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # COMPONENTES DE UI
 # ══════════════════════════════════════════════════════════════════════════════
-def render_metrica_card(label: str, valor: float, unidad: str, color: str, 
-                        limite: float = None, descripcion: str = None):
-    """Renderiza una tarjeta de métrica personalizada."""
+def metrica_card_html(label: str, valor: float, unidad: str, color: str,
+                      limite: float = None, descripcion: str = None) -> str:
+    """Devuelve el HTML de una tarjeta de métrica personalizada."""
     porcentaje = min(100, (valor / limite * 100)) if limite else 0
     nivel = obtener_nivel_calidad(valor, label.replace('₂', '2').replace('.', ''))
     color_valor = obtener_color_nivel(nivel) if limite else color
     
-    st.markdown(f"""
+    barra_limite = f'''
+        <div style="margin-top: 0.75rem; height: 4px; background: rgba(148, 163, 184, 0.1); border-radius: 2px;">
+            <div style="height: 100%; width: {porcentaje}%; background: {color_valor}; border-radius: 2px;"></div>
+        </div>
+        <div style="font-size: 0.65rem; color: #64748b; margin-top: 0.25rem;">Límite: {limite} {unidad}</div>''' if limite else ''
+    
+    # Sin líneas en blanco: el bloque HTML de Markdown terminaría en la primera
+    return f"""
     <div class="metric-card" style="--accent-color: {color}">
         <div class="metric-label">{descripcion or label}</div>
         <div style="font-size: 0.875rem; color: #94a3b8; font-weight: 600;">{label}</div>
         <div class="metric-value" style="color: {color_valor}">{valor:.0f}</div>
-        <div class="metric-unit">{unidad}</div>
-        {f'''
-        <div style="margin-top: 0.75rem; height: 4px; background: rgba(148, 163, 184, 0.1); border-radius: 2px;">
-            <div style="height: 100%; width: {porcentaje}%; background: {color_valor}; border-radius: 2px;"></div>
-        </div>
-        <div style="font-size: 0.65rem; color: #64748b; margin-top: 0.25rem;">Límite: {limite} {unidad}</div>
-        ''' if limite else ''}
-    </div>
-    """, unsafe_allow_html=True)
+        <div class="metric-unit">{unidad}</div>{barra_limite}
+    </div>"""
+
+
+def rejilla_html(bloques_html: list) -> str:
+    """
+    Devuelve el HTML de una fila de tarjetas en rejilla CSS (una columna por
+    bloque). Los bloques no deben contener líneas en blanco.
+    """
+    html = ''.join(bloques_html)
+    return f'<div class="metric-grid" style="--metric-cols: {len(bloques_html)}">{html}\n</div>'
+
+
+def render_rejilla(bloques_html: list):
+    """
+    Renderiza una fila de tarjetas HTML en un único st.markdown con rejilla
+    CSS, en lugar de un st.columns con un elemento por tarjeta.
+    """
+    st.markdown(rejilla_html(bloques_html), unsafe_allow_html=True)
+
+
+def render_metricas(tarjetas: list):
+    """Renderiza una fila de tarjetas de métrica (tuplas con los argumentos de metrica_card_html)."""
+    render_rejilla([metrica_card_html(*t) for t in tarjetas])
 
 
 def render_live_indicator():
@@ -817,8 +1247,8 @@ def render_estado_sistema():
         """, unsafe_allow_html=True)
 
 
-def render_evento_card(evento: dict):
-    """Renderiza una tarjeta de evento."""
+def evento_card_html(evento: dict) -> str:
+    """Devuelve el HTML de la tarjeta de un evento."""
     iconos = {
         'deportivo': '⚽',
         'cultural': '🎵',
@@ -837,7 +1267,7 @@ def render_evento_card(evento: dict):
     
     incremento = {'bajo': '+10%', 'medio': '+20%', 'alto': '+35%', 'muy_alto': '+50%'}
     
-    st.markdown(f"""
+    return f"""
     <div style="
         display: flex;
         align-items: center;
@@ -879,7 +1309,16 @@ def render_evento_card(evento: dict):
             </div>
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+
+def render_eventos(eventos: list):
+    """
+    Renderiza todas las tarjetas de eventos con un único st.markdown
+    (un solo elemento en el frontend en lugar de uno por evento).
+    """
+    if eventos:
+        st.markdown(''.join(evento_card_html(e) for e in eventos), unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -888,35 +1327,29 @@ def render_evento_card(evento: dict):
 def seccion_contaminacion(df: pd.DataFrame, barrio_filtro: str):
     """Renderiza la sección de contaminación."""
     
-    # Filtrar por barrio si es necesario
-    if barrio_filtro != 'Todos':
-        df = df[df['barrio'] == barrio_filtro]
-    
-    # Datos más recientes
-    df_reciente = df[df['fecha'] >= df['fecha'].max() - timedelta(hours=1)]
+    # El filtro por barrio y la última hora se aplican dentro de las
+    # funciones cacheadas, con clave (barrio_filtro, versión de los datos)
+    version = version_datos(df)
+    metricas = metricas_contaminacion(df, barrio_filtro, version)
     
     # Métricas principales
-    no2_actual = df_reciente['NO2'].mean()
-    pm25_actual = df_reciente['PM25'].mean()
-    o3_actual = df_reciente['O3'].mean()
-    pm10_actual = df_reciente['PM10'].mean()
+    no2_actual = metricas['NO2']
+    pm25_actual = metricas['PM25']
+    o3_actual = metricas['O3']
+    pm10_actual = metricas['PM10']
     ica = calcular_ica(no2_actual, pm25_actual, pm10_actual, o3_actual)
     
     # Fila de métricas
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        render_metrica_card('NO₂', no2_actual, 'µg/m³', COLORES['bueno'], 
-                           LIMITES_CONTAMINACION['NO2']['bueno'], 'Dióxido de nitrógeno')
-    with col2:
-        render_metrica_card('PM2.5', pm25_actual, 'µg/m³', COLORES['moderado'],
-                           LIMITES_CONTAMINACION['PM25']['bueno'], 'Partículas finas')
-    with col3:
-        render_metrica_card('O₃', o3_actual, 'µg/m³', COLORES['primary'],
-                           LIMITES_CONTAMINACION['O3']['bueno'], 'Ozono troposférico')
-    with col4:
-        render_metrica_card('ICA', ica, 'puntos', COLORES['muy_alto'],
-                           100, 'Índice Calidad Aire')
+    render_metricas([
+        ('NO₂', no2_actual, 'µg/m³', COLORES['bueno'],
+         LIMITES_CONTAMINACION['NO2']['bueno'], 'Dióxido de nitrógeno'),
+        ('PM2.5', pm25_actual, 'µg/m³', COLORES['moderado'],
+         LIMITES_CONTAMINACION['PM25']['bueno'], 'Partículas finas'),
+        ('O₃', o3_actual, 'µg/m³', COLORES['primary'],
+         LIMITES_CONTAMINACION['O3']['bueno'], 'Ozono troposférico'),
+        ('ICA', ica, 'puntos', COLORES['muy_alto'],
+         100, 'Índice Calidad Aire'),
+    ])
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -925,27 +1358,21 @@ def seccion_contaminacion(df: pd.DataFrame, barrio_filtro: str):
     
     with col_graf:
         st.markdown('<div class="card"><div class="card-title">📈 Evolución Últimas 24h</div></div>', unsafe_allow_html=True)
-        fig = crear_grafico_evolucion(df, 'NO2')
+        fig = crear_grafico_evolucion(df, 'NO2', barrio_filtro, version)
         st.plotly_chart(fig, use_container_width=True)
     
     with col_mapa:
         st.markdown('<div class="card"><div class="card-title">🗺️ Mapa de Calor - Valencia</div></div>', unsafe_allow_html=True)
-        mapa = crear_mapa_calor(df, 'NO2')
-        st_folium(mapa, width=None, height=350, returned_objects=[])
+        # HTML estático ya renderizado: sin reconstruir Folium ni el componente
+        # bidireccional de st_folium (el mapa no devuelve eventos a la app)
+        components.html(mapa_calor_html(df, 'NO2', barrio_filtro, version), height=350)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Tabla de barrios
     st.markdown('<div class="card"><div class="card-title">🏘️ Calidad del Aire por Barrios</div>', unsafe_allow_html=True)
     
-    df_tabla = df_reciente.groupby('barrio').agg({
-        'NO2': 'mean',
-        'PM25': 'mean',
-        'O3': 'mean'
-    }).round(1).reset_index()
-    
-    df_tabla['Estado'] = df_tabla['NO2'].apply(lambda x: obtener_nivel_calidad(x, 'NO2'))
-    df_tabla['Tendencia'] = np.random.choice(['↓', '→', '↑'], size=len(df_tabla))
+    df_tabla = metricas['tabla']
     
     df_tabla.columns = ['Barrio', 'NO₂ (µg/m³)', 'PM2.5 (µg/m³)', 'O₃ (µg/m³)', 'Estado', 'Tendencia']
     
@@ -954,6 +1381,9 @@ def seccion_contaminacion(df: pd.DataFrame, barrio_filtro: str):
         use_container_width=True,
         hide_index=True,
         column_config={
+            'NO₂ (µg/m³)': st.column_config.NumberColumn(format='%.1f'),
+            'PM2.5 (µg/m³)': st.column_config.NumberColumn(format='%.1f'),
+            'O₃ (µg/m³)': st.column_config.NumberColumn(format='%.1f'),
             'Estado': st.column_config.TextColumn(width='small'),
             'Tendencia': st.column_config.TextColumn(width='small'),
         }
@@ -969,34 +1399,34 @@ def seccion_precipitaciones(df_meteo: pd.DataFrame):
     
     st.markdown('<div class="card"><div class="card-title">🌤️ Pronóstico 5 días - Valencia</div>', unsafe_allow_html=True)
     
-    cols = st.columns(5)
+    tarjetas = []
     for i, p in enumerate(pronostico):
-        with cols[i]:
-            bg = 'rgba(59, 130, 246, 0.1)' if i == 0 else 'rgba(15, 23, 42, 0.5)'
-            border = 'rgba(59, 130, 246, 0.3)' if i == 0 else 'rgba(148, 163, 184, 0.1)'
-            
-            st.markdown(f"""
+        bg = 'rgba(59, 130, 246, 0.1)' if i == 0 else 'rgba(15, 23, 42, 0.5)'
+        border = 'rgba(59, 130, 246, 0.3)' if i == 0 else 'rgba(148, 163, 184, 0.1)'
+        
+        tarjetas.append(f"""
+        <div style="
+            background: {bg};
+            border: 1px solid {border};
+            border-radius: 12px;
+            padding: 1.25rem;
+            text-align: center;
+        ">
+            <div style="font-size: 0.75rem; color: #64748b;">{p['dia']}</div>
+            <div style="font-size: 2.5rem; margin: 0.5rem 0;">{p['icono']}</div>
+            <div style="font-size: 1.5rem; font-weight: 700; color: #e2e8f0;">{p['temp_max']}°C</div>
+            <div style="font-size: 0.875rem; color: #64748b;">{p['temp_min']}°C</div>
             <div style="
-                background: {bg};
-                border: 1px solid {border};
-                border-radius: 12px;
-                padding: 1.25rem;
-                text-align: center;
-            ">
-                <div style="font-size: 0.75rem; color: #64748b;">{p['dia']}</div>
-                <div style="font-size: 2.5rem; margin: 0.5rem 0;">{p['icono']}</div>
-                <div style="font-size: 1.5rem; font-weight: 700; color: #e2e8f0;">{p['temp_max']}°C</div>
-                <div style="font-size: 0.875rem; color: #64748b;">{p['temp_min']}°C</div>
-                <div style="
-                    margin-top: 0.75rem;
-                    padding: 0.35rem 0.75rem;
-                    background: {'rgba(59, 130, 246, 0.2)' if p['lluvia'] > 50 else 'rgba(148, 163, 184, 0.1)'};
-                    border-radius: 20px;
-                    font-size: 0.75rem;
-                    color: {'#3b82f6' if p['lluvia'] > 50 else '#94a3b8'};
-                ">💧 {p['lluvia']}%</div>
-            </div>
-            """, unsafe_allow_html=True)
+                margin-top: 0.75rem;
+                padding: 0.35rem 0.75rem;
+                background: {'rgba(59, 130, 246, 0.2)' if p['lluvia'] > 50 else 'rgba(148, 163, 184, 0.1)'};
+                border-radius: 20px;
+                font-size: 0.75rem;
+                color: {'#3b82f6' if p['lluvia'] > 50 else '#94a3b8'};
+            ">💧 {p['lluvia']}%</div>
+        </div>""")
+    
+    render_rejilla(tarjetas)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1033,122 +1463,91 @@ def seccion_precipitaciones(df_meteo: pd.DataFrame):
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Datos actuales
-    df_actual = df_meteo[df_meteo['fecha'] >= df_meteo['fecha'].max() - timedelta(hours=1)]
-    
-    col1, col2, col3, col4 = st.columns(4)
+    actual = metricas_meteorologia(df_meteo, version_datos(df_meteo))
     
     metricas_meteo = [
-        ('💧', 'Humedad', f"{df_actual['humedad'].mean():.0f}%", COLORES['primary']),
-        ('📊', 'Presión', f"{df_actual['presion'].mean():.0f} hPa", COLORES['muy_alto']),
-        ('💨', 'Viento', f"{df_actual['viento_velocidad'].mean():.0f} km/h", COLORES['bueno']),
-        ('🌡️', 'Temperatura', f"{df_actual['temperatura'].mean():.1f}°C", COLORES['moderado']),
+        ('💧', 'Humedad', f"{actual['humedad']:.0f}%", COLORES['primary']),
+        ('📊', 'Presión', f"{actual['presion']:.0f} hPa", COLORES['muy_alto']),
+        ('💨', 'Viento', f"{actual['viento_velocidad']:.0f} km/h", COLORES['bueno']),
+        ('🌡️', 'Temperatura', f"{actual['temperatura']:.1f}°C", COLORES['moderado']),
     ]
     
-    for col, (icono, label, valor, color) in zip([col1, col2, col3, col4], metricas_meteo):
-        with col:
-            st.markdown(f"""
-            <div class="card" style="text-align: center;">
-                <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icono}</div>
-                <div style="font-size: 0.7rem; color: #64748b; margin-bottom: 0.25rem;">{label}</div>
-                <div style="font-size: 1.25rem; font-weight: 700; color: {color};">{valor}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    render_rejilla([
+        f"""
+        <div class="card" style="text-align: center;">
+            <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icono}</div>
+            <div style="font-size: 0.7rem; color: #64748b; margin-bottom: 0.25rem;">{label}</div>
+            <div style="font-size: 1.25rem; font-weight: 700; color: {color};">{valor}</div>
+        </div>"""
+        for icono, label, valor, color in metricas_meteo
+    ])
 
 
 def seccion_trafico(df: pd.DataFrame):
     """Renderiza la sección de tráfico."""
     
-    df_reciente = df[df['fecha'] >= df['fecha'].max() - timedelta(hours=1)]
+    version = version_datos(df)
+    metricas = metricas_trafico(df, version)
     
     # Métricas principales
-    intensidad_media = df_reciente['intensidad'].mean()
-    velocidad_media = df_reciente['velocidad_media'].mean()
-    ocupacion_media = df_reciente['ocupacion'].mean()
+    intensidad_media = metricas['intensidad']
+    velocidad_media = metricas['velocidad_media']
+    ocupacion_media = metricas['ocupacion']
     
     # Determinar estados
     estado_intensidad = 'Moderado' if intensidad_media > 1500 else 'Fluido'
     estado_velocidad = 'Fluido' if velocidad_media > 35 else 'Lento'
     estado_ocupacion = 'Atención' if ocupacion_media > 50 else 'Normal'
     
-    col1, col2, col3 = st.columns(3)
+    tarjetas = []
     
-    with col1:
-        color = COLORES['moderado'] if estado_intensidad == 'Moderado' else COLORES['bueno']
-        st.markdown(f"""
-        <div class="card">
-            <div style="font-size: 0.75rem; color: #64748b; margin-bottom: 0.5rem;">Intensidad media</div>
-            <div style="display: flex; align-items: baseline; gap: 0.5rem;">
-                <span style="font-size: 2.25rem; font-weight: 700; color: {color};">{intensidad_media:,.0f}</span>
-                <span style="font-size: 0.875rem; color: #64748b;">veh/h</span>
-            </div>
-            <div class="badge badge-{'moderado' if estado_intensidad == 'Moderado' else 'bueno'}" style="margin-top: 0.75rem;">
-                {estado_intensidad}
-            </div>
+    color = COLORES['moderado'] if estado_intensidad == 'Moderado' else COLORES['bueno']
+    tarjetas.append(f"""
+    <div class="card">
+        <div style="font-size: 0.75rem; color: #64748b; margin-bottom: 0.5rem;">Intensidad media</div>
+        <div style="display: flex; align-items: baseline; gap: 0.5rem;">
+            <span style="font-size: 2.25rem; font-weight: 700; color: {color};">{intensidad_media:,.0f}</span>
+            <span style="font-size: 0.875rem; color: #64748b;">veh/h</span>
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        color = COLORES['bueno'] if estado_velocidad == 'Fluido' else COLORES['alto']
-        st.markdown(f"""
-        <div class="card">
-            <div style="font-size: 0.75rem; color: #64748b; margin-bottom: 0.5rem;">Velocidad media</div>
-            <div style="display: flex; align-items: baseline; gap: 0.5rem;">
-                <span style="font-size: 2.25rem; font-weight: 700; color: {color};">{velocidad_media:.0f}</span>
-                <span style="font-size: 0.875rem; color: #64748b;">km/h</span>
-            </div>
-            <div class="badge badge-{'bueno' if estado_velocidad == 'Fluido' else 'alto'}" style="margin-top: 0.75rem;">
-                {estado_velocidad}
-            </div>
+        <div class="badge badge-{'moderado' if estado_intensidad == 'Moderado' else 'bueno'}" style="margin-top: 0.75rem;">
+            {estado_intensidad}
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        color = COLORES['alto'] if estado_ocupacion == 'Atención' else COLORES['bueno']
-        st.markdown(f"""
-        <div class="card">
-            <div style="font-size: 0.75rem; color: #64748b; margin-bottom: 0.5rem;">Ocupación vías</div>
-            <div style="display: flex; align-items: baseline; gap: 0.5rem;">
-                <span style="font-size: 2.25rem; font-weight: 700; color: {color};">{ocupacion_media:.0f}</span>
-                <span style="font-size: 0.875rem; color: #64748b;">%</span>
-            </div>
-            <div class="badge badge-{'alto' if estado_ocupacion == 'Atención' else 'bueno'}" style="margin-top: 0.75rem;">
-                {estado_ocupacion}
-            </div>
+    </div>""")
+    
+    color = COLORES['bueno'] if estado_velocidad == 'Fluido' else COLORES['alto']
+    tarjetas.append(f"""
+    <div class="card">
+        <div style="font-size: 0.75rem; color: #64748b; margin-bottom: 0.5rem;">Velocidad media</div>
+        <div style="display: flex; align-items: baseline; gap: 0.5rem;">
+            <span style="font-size: 2.25rem; font-weight: 700; color: {color};">{velocidad_media:.0f}</span>
+            <span style="font-size: 0.875rem; color: #64748b;">km/h</span>
         </div>
-        """, unsafe_allow_html=True)
+        <div class="badge badge-{'bueno' if estado_velocidad == 'Fluido' else 'alto'}" style="margin-top: 0.75rem;">
+            {estado_velocidad}
+        </div>
+    </div>""")
+    
+    color = COLORES['alto'] if estado_ocupacion == 'Atención' else COLORES['bueno']
+    tarjetas.append(f"""
+    <div class="card">
+        <div style="font-size: 0.75rem; color: #64748b; margin-bottom: 0.5rem;">Ocupación vías</div>
+        <div style="display: flex; align-items: baseline; gap: 0.5rem;">
+            <span style="font-size: 2.25rem; font-weight: 700; color: {color};">{ocupacion_media:.0f}</span>
+            <span style="font-size: 0.875rem; color: #64748b;">%</span>
+        </div>
+        <div class="badge badge-{'alto' if estado_ocupacion == 'Atención' else 'bueno'}" style="margin-top: 0.75rem;">
+            {estado_ocupacion}
+        </div>
+    </div>""")
+    
+    render_rejilla(tarjetas)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Gráfico de intensidad por ubicación
     st.markdown('<div class="card"><div class="card-title">🛣️ Intensidad por Vía Principal</div>', unsafe_allow_html=True)
     
-    df_vias = df_reciente.groupby('ubicacion')['intensidad'].mean().sort_values(ascending=True).reset_index()
-    
-    colores_vias = [
-        COLORES['bueno'] if v < 1200 else (COLORES['moderado'] if v < 1800 else COLORES['alto'])
-        for v in df_vias['intensidad']
-    ]
-    
-    fig = go.Figure(go.Bar(
-        y=df_vias['ubicacion'],
-        x=df_vias['intensidad'],
-        orientation='h',
-        marker_color=colores_vias,
-        text=df_vias['intensidad'].apply(lambda x: f'{x:,.0f}'),
-        textposition='outside'
-    ))
-    
-    fig.update_layout(
-        template='plotly_dark',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=20, r=80, t=20, b=20),
-        height=300,
-        xaxis=dict(showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)', title='Vehículos/hora'),
-        yaxis=dict(showgrid=False, title=None),
-        showlegend=False
-    )
-    
+    fig = crear_grafico_vias(metricas['vias'], version)
     st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1163,9 +1562,11 @@ def seccion_trafico(df: pd.DataFrame):
         {'tipo': 'Evento', 'ubicacion': 'Zona Mestalla', 'hora': 'Partido 21:00', 'severidad': 'prevista', 'icono': '🏟️'},
     ]
     
+    # Todas las incidencias en un único st.markdown
+    html_incidencias = []
     for inc in incidencias:
         color_borde = COLORES['alto'] if inc['severidad'] == 'alta' else (COLORES['moderado'] if inc['severidad'] == 'media' else COLORES['muy_alto'])
-        st.markdown(f"""
+        html_incidencias.append(f"""
         <div style="
             display: flex;
             align-items: center;
@@ -1182,62 +1583,63 @@ def seccion_trafico(df: pd.DataFrame):
                 <div style="font-size: 0.8rem; color: #94a3b8;">{inc['ubicacion']}</div>
             </div>
             <div style="font-size: 0.75rem; color: #64748b;">{inc['hora']}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        </div>""")
+    st.markdown(''.join(html_incidencias), unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+# Impacto medido durante Fallas 2025 vs. media anual (datos fijos)
+METRICAS_FALLAS = [
+    ('NO₂', '+45%', '65 µg/m³'),
+    ('PM2.5', '+120%', '62 µg/m³'),
+    ('PM10', '+85%', '78 µg/m³'),
+    ('Tráfico', '+35%', '3,200 veh/h'),
+]
+
+HTML_FALLAS_CABECERA = """
+<div class="alerta-card alerta-fallas">
+    <div style="display: flex; align-items: center; gap: 1.25rem; margin-bottom: 1.5rem;">
+        <div style="font-size: 3rem;">🔥</div>
+        <div>
+            <div style="font-size: 1.25rem; font-weight: 700; color: #ef4444;">Análisis Histórico: Fallas</div>
+            <div style="color: #94a3b8; font-size: 0.875rem; margin-top: 0.25rem;">
+                Impacto medido durante Fallas 2025 vs. media anual
+            </div>
+        </div>
+    </div>
+"""
+
+HTML_METRICAS_FALLAS = rejilla_html([
+    f"""<div style="
+        background: rgba(15, 23, 42, 0.6);
+        border-radius: 8px;
+        padding: 1rem;
+        text-align: center;
+    ">
+        <div style="font-size: 0.75rem; color: #94a3b8;">{label}</div>
+        <div style="font-size: 1.5rem; font-weight: 700; color: #ef4444; margin-top: 0.25rem;">{incremento}</div>
+        <div style="font-size: 0.7rem; color: #64748b; margin-top: 0.25rem;">{valor}</div>
+    </div>"""
+    for label, incremento, valor in METRICAS_FALLAS
+])
+
+
 def seccion_eventos(df_eventos: pd.DataFrame):
     """Renderiza la sección de eventos."""
     
     # Próximos eventos
     st.markdown('<div class="card"><div class="card-title">📅 Próximos Eventos con Impacto</div>', unsafe_allow_html=True)
     
-    for _, evento in df_eventos.iterrows():
-        render_evento_card(evento.to_dict())
+    render_eventos(df_eventos.to_dict('records'))
     
     st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
-    # Análisis histórico Fallas
-    st.markdown("""
-    <div class="alerta-card alerta-fallas">
-        <div style="display: flex; align-items: center; gap: 1.25rem; margin-bottom: 1.5rem;">
-            <div style="font-size: 3rem;">🔥</div>
-            <div>
-                <div style="font-size: 1.25rem; font-weight: 700; color: #ef4444;">Análisis Histórico: Fallas</div>
-                <div style="color: #94a3b8; font-size: 0.875rem; margin-top: 0.25rem;">
-                    Impacto medido durante Fallas 2025 vs. media anual
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    metricas_fallas = [
-        ('NO₂', '+45%', '65 µg/m³'),
-        ('PM2.5', '+120%', '62 µg/m³'),
-        ('PM10', '+85%', '78 µg/m³'),
-        ('Tráfico', '+35%', '3,200 veh/h'),
-    ]
-    
-    for col, (label, incremento, valor) in zip([col1, col2, col3, col4], metricas_fallas):
-        with col:
-            st.markdown(f"""
-            <div style="
-                background: rgba(15, 23, 42, 0.6);
-                border-radius: 8px;
-                padding: 1rem;
-                text-align: center;
-            ">
-                <div style="font-size: 0.75rem; color: #94a3b8;">{label}</div>
-                <div style="font-size: 1.5rem; font-weight: 700; color: #ef4444; margin-top: 0.25rem;">{incremento}</div>
-                <div style="font-size: 0.7rem; color: #64748b; margin-top: 0.25rem;">{valor}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    # Análisis histórico Fallas (HTML estático, pre-renderizado al importar)
+    st.markdown(HTML_FALLAS_CABECERA, unsafe_allow_html=True)
+    st.markdown(HTML_METRICAS_FALLAS, unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1246,46 +1648,7 @@ def seccion_eventos(df_eventos: pd.DataFrame):
     # Gráfico de correlación
     st.markdown('<div class="card"><div class="card-title">📊 Correlación Eventos-Contaminación (2025)</div>', unsafe_allow_html=True)
     
-    meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-    valores_base = [42, 40, 45, 38, 35, 32, 30, 28, 35, 40, 42, 45]
-    valores_eventos = [50, 42, 85, 40, 36, 34, 55, 30, 38, 52, 44, 55]
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=meses,
-        y=valores_eventos,
-        name='Con eventos',
-        marker_color=[COLORES['alto'] if v > 60 else COLORES['moderado'] for v in valores_eventos]
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=meses,
-        y=valores_base,
-        name='Media base',
-        mode='lines+markers',
-        line=dict(color=COLORES['secondary'], dash='dash'),
-        marker=dict(size=6)
-    ))
-    
-    fig.update_layout(
-        template='plotly_dark',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=20, r=20, t=30, b=20),
-        height=300,
-        xaxis=dict(showgrid=False, title=None),
-        yaxis=dict(showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)', title='NO₂ (µg/m³)'),
-        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1),
-        barmode='group'
-    )
-    
-    # Anotaciones de eventos
-    fig.add_annotation(x='Mar', y=85, text='Fallas', showarrow=True, arrowhead=2, ax=0, ay=-30, font=dict(size=10, color='#ef4444'))
-    fig.add_annotation(x='Jul', y=55, text='Feria', showarrow=True, arrowhead=2, ax=0, ay=-30, font=dict(size=10, color='#f59e0b'))
-    fig.add_annotation(x='Oct', y=52, text='9 Oct', showarrow=True, arrowhead=2, ax=0, ay=-30, font=dict(size=10, color='#f59e0b'))
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(crear_grafico_correlacion(), use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -1384,105 +1747,13 @@ def main():
     # Leyenda global
     render_leyenda_tipos_datos()
     
-    # Cargar datos
-    with st.spinner('Cargando datos...'):
-        df_contaminacion = cargar_datos_contaminacion()
-        df_meteorologia = cargar_datos_meteorologia()
-        df_trafico = cargar_datos_trafico()
-        df_eventos = cargar_eventos()
-    
-    # Tabs principales
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "🌫️ Contaminación",
-        "🌧️ Precipitaciones", 
-        "🚗 Tráfico",
-        "🎭 Eventos"
-    ])
-    
-    with tab1:
-        seccion_contaminacion(df_contaminacion, barrio_seleccionado)
-    
-    with tab2:
-        seccion_precipitaciones(df_meteorologia)
-    
-    with tab3:
-        seccion_trafico(df_trafico)
-    
-    with tab4:
-        seccion_eventos(df_eventos)
-
-
-# ══════════════════════════════════════════════════════════════════════════════
-# PUNTO DE ENTRADA
-# ══════════════════════════════════════════════════════════════════════════════
-if __name__ == "__main__":
-    # Crear directorio de logs si no existe
-    Path('logs').mkdir(exist_ok=True)
-    
-    # Ejecutar aplicación
-    try:
-        main()
-    except Exception as e:
-        logger.error(f"Error en la aplicación: {e}", exc_info=True)
-        st.error(f"Ha ocurrido un error: {e}")
-            key='filtro_fecha_inicio'
-        )
-        
-        fecha_fin = st.date_input(
-            "Fecha fin",
-            value=datetime.now(),
-            key='filtro_fecha_fin'
-        )
-        
-        contaminante = st.multiselect(
-            "Contaminantes",
-            ['NO₂', 'PM2.5', 'PM10', 'O₃'],
-            default=['NO₂'],
-            key='filtro_contaminante'
-        )
-        
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        # Estado del sistema
-        render_estado_sistema()
-        
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        # Créditos
-        st.markdown("""
-        <div style="font-size: 0.65rem; color: #64748b; text-align: center; padding-top: 1rem; border-top: 1px solid rgba(148, 163, 184, 0.1);">
-            Desarrollado por Joan<br>
-            Proyecto Data Detective<br>
-            <span style="color: #10b981;">v1.0.0</span>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # ══════════════════════════════════════════════════════════════════════════
-    # CONTENIDO PRINCIPAL
-    # ══════════════════════════════════════════════════════════════════════════
-    
-    # Header
-    st.markdown("""
-    <h1 style="display: flex; align-items: center; gap: 0.75rem;">
-        <span>Dashboard</span>
-        <span style="color: #64748b; font-weight: 300;">|</span>
-        <span style="background: linear-gradient(135deg, #f59e0b, #ef4444); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">
-            Valencia
-        </span>
-    </h1>
-    <p style="color: #64748b; margin-top: 0;">
-        Monitorización en tiempo real de calidad del aire, meteorología y tráfico urbano
-    </p>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Cargar datos
-    with st.spinner('Cargando datos...'):
-        df_contaminacion = cargar_datos_contaminacion()
-        df_meteorologia = cargar_datos_meteorologia()
-        df_trafico = cargar_datos_trafico()
-        df_eventos = cargar_eventos()
+    # Cargar datos (cada cargador muestra su spinner solo si no está en caché)
+    df_contaminacion, df_meteorologia, df_trafico, df_eventos = cargar_datos_en_paralelo(
+        cargar_datos_contaminacion,
+        cargar_datos_meteorologia,
+        cargar_datos_trafico,
+        cargar_eventos,
+    )
     
     # Tabs principales
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -21,6 +21,8 @@ Datos de salida:
        → Medias mensuales de precipitación
     3. 3.DATOS_LIMPIOS/estadisticas/tendencias_historicas.csv
        → Tendencias históricas anuales (contaminación + meteorología)
+    Con pyarrow instalado se escribe además una copia .parquet de cada
+    fichero, que el dashboard puede leer sin parsear CSV.
 
 Decisiones de diseño:
     - Solo se usan registros con calidad_dato == "ok" para contaminación.
@@ -41,12 +43,28 @@ Fecha: 2026
 Proyecto: Data Detective Valencia
 """
 
+import atexit
+import numpy as np
 import pandas as pd
 import logging
+import queue
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional, Tuple
 
+# pyarrow: escritura CSV/Parquet en C++ (opcional; si falta, se usa pandas)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
 # ==============================================================================
 # CONFIGURACIÓN
 # ==============================================================================
@@ -60,6 +78,30 @@ LOG_DIR = PROJECT_ROOT / "logs"
 CONTAMINACION_FILE = DATOS_LIMPIOS_DIR / "contaminacion_normalizada.parquet"
 METEOROLOGIA_FILE = DATOS_LIMPIOS_DIR / "meteorologia_limpio.csv"
 
+# Caché Parquet del CSV de meteorología con las fechas ya convertidas
+# (se regenera cuando el CSV es más reciente)
+CACHE_DIR = DATOS_LIMPIOS_DIR / "cache"
+METEOROLOGIA_CACHE = CACHE_DIR / "meteorologia_limpio.parquet"
+
+# Columnas de contaminación que usan las tareas (el resto no se lee)
+COLUMNAS_CONTAMINACION = ["fecha_utc", "estacion_id",
+                          "variable", "valor", "calidad_dato"]
+
+# Claves de agrupación de contaminación: se cargan como category
+#
+# Tipos: las columnas de texto (claves, calidad_dato) van como category y
+# las numéricas se quedan en NumPy float64. No usar dtype_backend="pyarrow"
+# para todo el DataFrame: groupby().mean()/sum() sobre double[pyarrow] es
+# órdenes de magnitud más lento que sobre float64 de NumPy.
+COLUMNAS_CATEGORICAS = ["estacion_id", "variable"]
+
+# Columnas de meteorología que usan las tareas
+COLUMNAS_METEOROLOGIA = ["fecha", "precipitacion_mm", "temp_c",
+                         "humedad_pct", "calidad_dato"]
+
+# Filas por lote al recorrer el Parquet de contaminación
+TAMANO_LOTE = 500_000
+
 # Ficheros de salida
 OUT_CONTAM_ANUAL = STATS_DIR / "contaminacion_media_anual_barrio.csv"
 OUT_PRECIP_MENSUAL = STATS_DIR / "precipitacion_media_mensual.csv"
@@ -87,16 +129,57 @@ ESTACION_BARRIO_MAP = {
     "46250054": "Ciutat Vella",          # Conselleria Meteo → distrito Ciutat Vella
 }
 
+# Barrios en orden alfabético: orden de las categorías de la columna 'barrio'
+BARRIOS = sorted(set(ESTACION_BARRIO_MAP.values()))
+
+
+def mapear_barrios(estaciones: pd.Series) -> pd.Series:
+    """
+    Mapea estacion_id → barrio como columna categórica (códigos int8).
+
+    El diccionario se aplica solo a las estaciones distintas (categorías)
+    y los códigos resultantes se propagan por fila con indexado NumPy, en
+    lugar de resolver el string de cada registro con .map(dict). Si
+    `estaciones` ya es categórica (ver cargar_contaminacion), el astype
+    inicial no hace nada.
+    rename_categories no sirve aquí: varias estaciones comparten barrio.
+    Las estaciones sin mapeo quedan como NaN.
+    """
+    cat = estaciones.astype("category")
+    barrios_por_estacion = cat.cat.categories.map(ESTACION_BARRIO_MAP)
+    codigos_estacion = pd.Categorical(
+        barrios_por_estacion, categories=BARRIOS).codes.astype(np.int8)
+
+    codigos_fila = cat.cat.codes.to_numpy()
+    # codes == -1 → estacion_id nulo; se conserva como NaN
+    codigos = np.where(codigos_fila >= 0,
+                       codigos_estacion[codigos_fila], np.int8(-1))
+
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=BARRIOS),
+        index=estaciones.index,
+        name="barrio",
+    )
+
 
 # ==============================================================================
 # CONFIGURACIÓN DE LOGGING
 # ==============================================================================
 
+# Hilo que escribe en archivo/consola los registros encolados por el logger
+_log_listener: Optional[QueueListener] = None
+
+
 def setup_logging() -> logging.Logger:
     """
     Configura logging dual (archivo + consola).
-    Mismo patrón que normalizar_contaminacion.py (Fase 5.1).
+    Mismo patrón que normalizar_contaminacion.py (Fase 5.1), pero los
+    handlers cuelgan de un QueueListener: cada logger.info() solo encola
+    el registro y la E/S se hace en un hilo aparte.
     """
+    global _log_listener
+    detener_logging()
+
     LOG_DIR.mkdir(parents=True, exist_ok=True)
 
     log_file = LOG_DIR / "calcular_estadisticas.log"
@@ -117,26 +200,71 @@ def setup_logging() -> logging.Logger:
     ch.setLevel(logging.INFO)
     ch.setFormatter(logging.Formatter(log_format, date_format))
 
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+
+    # respect_handler_level: la consola sigue filtrando por debajo de INFO
+    _log_listener = QueueListener(log_queue, fh, ch, respect_handler_level=True)
+    _log_listener.start()
 
     return logger
 
 
+def detener_logging() -> None:
+    """
+    Vacía la cola de logging y cierra los handlers (idempotente).
+    Se llama al final de main() para que los mensajes salgan antes que los
+    print() finales, y en atexit por si el script termina por otra vía.
+    """
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
+    _log_listener = None
+
+
+atexit.register(detener_logging)
+
+
 # ==============================================================================
 # CARGA DE DATOS
 # ==============================================================================
 
+def categorizar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte COLUMNAS_CATEGORICAS a category con categorías en orden
+    alfabético (un diccionario Parquet viene en orden de aparición), de
+    modo que ordenar por esas columnas sigue siendo alfabético.
+    """
+    for col in COLUMNAS_CATEGORICAS:
+        df[col] = df[col].astype("category")
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+
 def cargar_contaminacion(logger: logging.Logger) -> Optional[pd.DataFrame]:
     """
-    Carga el Parquet normalizado de contaminación (Fase 5.1).
+    Carga el Parquet normalizado de contaminación (Fase 5.1) y lo reduce
+    al pre-agregado anual por estación (ver agregar_contaminacion_anual).
 
     Esquema esperado:
         fecha_utc, estacion_id, estacion_nombre, fuente,
         variable, valor, unidad, calidad_dato
 
+    Solo se leen COLUMNAS_CONTAMINACION y el filtro calidad_dato == "ok"
+    se empuja al lector Parquet, que no llega a decodificar el resto.
+
+    Con pyarrow el fichero se recorre por lotes de TAMANO_LOTE filas y
+    cada lote se reduce a sumas/conteos antes de leer el siguiente: la
+    memoria pico es la de un lote más los grupos, no la del fichero.
+    estacion_id y variable se leen como diccionario (category), sin crear
+    un objeto str por fila. Sin pyarrow se lee el fichero completo.
+
     Returns:
-        DataFrame o None si el fichero no existe / está vacío.
+        DataFrame [año, estacion_id, variable, suma, n] o None si el
+        fichero no existe / no tiene registros válidos.
     """
     if not CONTAMINACION_FILE.exists():
         logger.error(f"No se encuentra: {CONTAMINACION_FILE}")
@@ -146,21 +274,86 @@ def cargar_contaminacion(logger: logging.Logger) -> Optional[pd.DataFrame]:
     logger.info(f"Cargando contaminación: {CONTAMINACION_FILE.name}")
 
     try:
-        df = pd.read_parquet(CONTAMINACION_FILE)
+        if PYARROW_DISPONIBLE:
+            dataset = ds.dataset(
+                CONTAMINACION_FILE,
+                format=ds.ParquetFileFormat(
+                    read_options={"dictionary_columns": COLUMNAS_CATEGORICAS}),
+            )
+            total = dataset.count_rows()
+
+            parciales = []
+            n_ok = 0
+            fecha_min = fecha_max = None
+            for lote in dataset.to_batches(
+                columns=COLUMNAS_CONTAMINACION,
+                filter=ds.field("calidad_dato") == "ok",
+                batch_size=TAMANO_LOTE,
+            ):
+                if lote.num_rows == 0:
+                    continue
+                n_ok += lote.num_rows
+
+                # Año y rango con kernels Arrow: fecha_utc no llega a pandas
+                # fecha_utc ya está en UTC: quitar la zona (sin convertir)
+                # da el mismo año y evita la conversión horaria de pc.year
+                fechas = lote.column("fecha_utc")
+                años = pc.year(
+                    fechas.cast(pa.timestamp(fechas.type.unit))
+                ).to_numpy(zero_copy_only=False)
+                rango = pc.min_max(fechas)
+                lote_min, lote_max = rango["min"].as_py(), rango["max"].as_py()
+                if lote_min is not None:
+                    fecha_min = lote_min if fecha_min is None else min(fecha_min, lote_min)
+                    fecha_max = lote_max if fecha_max is None else max(fecha_max, lote_max)
+
+                df_lote = lote.select(["estacion_id", "variable", "valor"]).to_pandas()
+                parciales.append(agregar_contaminacion_anual(df_lote, años))
+
+            if not parciales:
+                logger.warning("Sin registros válidos (ok) de contaminación")
+                return None
+
+            # Cada lote trae su propio diccionario: se unifican al recombinar
+            df_anual = categorizar(
+                pd.concat(parciales, ignore_index=True)
+                .groupby(["año", "estacion_id", "variable"], as_index=False,
+                         observed=True, sort=False)
+                [["suma", "n"]]
+                .sum()
+            )
+        else:
+            df = pd.read_parquet(
+                CONTAMINACION_FILE,
+                columns=COLUMNAS_CONTAMINACION,
+                filters=[("calidad_dato", "==", "ok")],
+            )
+            total = None
+            # fastparquet solo descarta row groups completos: filtrar filas
+            df = df[df["calidad_dato"] == "ok"]
+            if df.empty:
+                logger.warning("Sin registros válidos (ok) de contaminación")
+                return None
+
+            n_ok = len(df)
+            fecha_min, fecha_max = df["fecha_utc"].min(), df["fecha_utc"].max()
+            df_anual = agregar_contaminacion_anual(categorizar(df))
+            del df
     except Exception as e:
         logger.error(f"Error leyendo Parquet: {e}")
         return None
 
-    if df.empty:
-        logger.warning("Fichero de contaminación vacío")
-        return None
-
-    logger.info(f"  → {len(df):,} registros cargados")
-    logger.info(f"  → Columnas: {list(df.columns)}")
-    logger.info(
-        f"  → Rango: {df['fecha_utc'].min()} → {df['fecha_utc'].max()}")
+    if total is not None:
+        logger.info(f"  → [contaminación] Registros válidos (ok): {n_ok:,} / {total:,}")
+        if total > n_ok:
+            logger.info(f"  → [contaminación] Descartados (invalid/missing): {total - n_ok:,}")
+    else:
+        logger.info(f"  → [contaminación] {n_ok:,} registros válidos (ok) cargados")
+    logger.info(f"  → [contaminación] Rango: {fecha_min} → {fecha_max}")
+    logger.info(f"  → [contaminación] Pre-agregado anual: {len(df_anual):,} grupos "
+                f"(año, estación, variable)")
 
-    return df
+    return df_anual
 
 
 def cargar_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
@@ -171,8 +364,14 @@ def cargar_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
         fecha, hora, precipitacion_mm, temp_c, humedad_pct,
         fuente, calidad_dato
 
+    El parseo del CSV y la conversión de fechas solo se hacen cuando el CSV
+    es más reciente que METEOROLOGIA_CACHE (Parquet); en el resto de
+    ejecuciones se lee la caché con proyección de COLUMNAS_METEOROLOGIA y
+    el filtro (calidad_dato == "ok" y fecha válida) empujados al lector.
+
     Returns:
-        DataFrame o None si el fichero no existe / está vacío.
+        DataFrame (solo registros ok con fecha válida: las tareas no vuelven
+        a filtrar) o None si el fichero no existe / está vacío.
     """
     if not METEOROLOGIA_FILE.exists():
         logger.error(f"No se encuentra: {METEOROLOGIA_FILE}")
@@ -181,7 +380,73 @@ def cargar_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
 
     logger.info(f"Cargando meteorología: {METEOROLOGIA_FILE.name}")
 
+    cache_valida = (
+        PYARROW_DISPONIBLE
+        and METEOROLOGIA_CACHE.exists()
+        and METEOROLOGIA_CACHE.stat().st_mtime >= METEOROLOGIA_FILE.stat().st_mtime
+    )
+
     try:
+        if cache_valida:
+            logger.info(f"  → [meteorología] Desde caché: {METEOROLOGIA_CACHE.name}")
+            total = pq.read_metadata(METEOROLOGIA_CACHE).num_rows
+            columnas = pq.read_schema(METEOROLOGIA_CACHE).names
+            df = pd.read_parquet(
+                METEOROLOGIA_CACHE,
+                engine="pyarrow",
+                columns=[c for c in COLUMNAS_METEOROLOGIA if c in columnas],
+                filters=(ds.field("calidad_dato") == "ok") & ds.field("fecha").is_valid(),
+            )
+        else:
+            df = leer_csv_meteorologia(logger)
+            total = len(df)
+            if PYARROW_DISPONIBLE:
+                guardar_cache_parquet(df, METEOROLOGIA_CACHE, logger)
+            df = df.loc[df["calidad_dato"].eq("ok") & df["fecha"].notna(),
+                        [c for c in COLUMNAS_METEOROLOGIA if c in df.columns]]
+
+    except Exception as e:
+        logger.error(f"Error leyendo meteorología: {e}")
+        return None
+
+    if df.empty:
+        logger.warning("Sin registros válidos (ok, con fecha) de meteorología")
+        return None
+
+    df["calidad_dato"] = df["calidad_dato"].astype("category")
+
+    logger.info(f"  → [meteorología] Registros válidos (ok, con fecha): {len(df):,} / {total:,}")
+    # min/max recorren la columna completa: solo si INFO está activo
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"  → [meteorología] Columnas: {list(df.columns)}")
+        logger.info(f"  → [meteorología] Rango: {df['fecha'].min()} → {df['fecha'].max()}")
+
+    return df
+
+
+def leer_csv_meteorologia(logger: logging.Logger) -> pd.DataFrame:
+    """
+    Lee METEOROLOGIA_FILE y convierte 'fecha' a datetime UTC (NaT si no
+    es válida).
+
+    Con pyarrow, el lector CSV multihilo de Arrow parsea 'fecha' como
+    timestamp UTC en la misma pasada. Si alguna fecha no es un ISO 8601
+    con zona (lo que escribe limpiar_meteorologia.py), se repite la
+    lectura con pandas y to_datetime(errors='coerce').
+    """
+    df = None
+    if PYARROW_DISPONIBLE:
+        try:
+            tabla = pa_csv.read_csv(
+                METEOROLOGIA_FILE,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={"fecha": pa.timestamp("ns", tz="UTC")}),
+            )
+            df = tabla.to_pandas()
+        except pa.ArrowInvalid as e:
+            logger.debug(f"  Fechas no ISO 8601 con zona, se usa pandas: {e}")
+
+    if df is None:
         # Cargar primero sin parsear fechas para inspeccionar
         df = pd.read_csv(METEOROLOGIA_FILE)
 
@@ -189,30 +454,103 @@ def cargar_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
         # errors='coerce' convertirá valores inválidos a NaT (Not a Time)
         df["fecha"] = pd.to_datetime(df["fecha"], errors='coerce', utc=True)
 
-        # Verificar si hay fechas inválidas
-        fechas_invalidas = df["fecha"].isna().sum()
-        if fechas_invalidas > 0:
-            logger.warning(
-                f"  {fechas_invalidas:,} fechas inválidas encontradas y convertidas a NaT")
-            # Opcional: mostrar algunos ejemplos de fechas inválidas
+    # Verificar si hay fechas inválidas
+    fechas_invalidas = df["fecha"].isna().sum()
+    if fechas_invalidas > 0:
+        logger.warning(
+            f"  → [meteorología] {fechas_invalidas:,} fechas inválidas encontradas y convertidas a NaT")
+        # Opcional: mostrar algunos ejemplos de fechas inválidas (recorre
+        # todo el DataFrame: solo si DEBUG está activo)
+        if logger.isEnabledFor(logging.DEBUG):
             muestra_invalidas = df[df["fecha"].isna()].head(3)
             if not muestra_invalidas.empty:
                 logger.debug(
                     f"  Ejemplos de fechas inválidas: {muestra_invalidas.iloc[:, 0].tolist()}")
 
+    return df
+
+
+def guardar_cache_parquet(df: pd.DataFrame, path: Path, logger: logging.Logger) -> None:
+    """
+    Escribe `df` como Parquet (zstd) de forma atómica: se escribe a un
+    temporal y se renombra, así una ejecución concurrente nunca lee una
+    caché a medias. Un fallo solo se registra: la caché es opcional.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_tmp = path.with_suffix(".parquet.tmp")
+        df.to_parquet(path_tmp, engine="pyarrow", compression="zstd", index=False)
+        path_tmp.replace(path)
+        logger.debug(f"  Caché Parquet actualizada: {path}")
     except Exception as e:
-        logger.error(f"Error leyendo CSV: {e}")
-        return None
+        logger.warning(f"  No se pudo guardar la caché {path.name}: {e}")
 
-    if df.empty:
-        logger.warning("Fichero de meteorología vacío")
-        return None
+# ==============================================================================
+# PRE-AGREGACIÓN ANUAL DE CONTAMINACIÓN
+# ==============================================================================
 
-    logger.info(f"  → {len(df):,} registros cargados")
-    logger.info(f"  → Columnas: {list(df.columns)}")
-    logger.info(f"  → Rango: {df['fecha'].min()} → {df['fecha'].max()}")
+def agregar_contaminacion_anual(
+    df: pd.DataFrame,
+    años: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """
+    Reduce los registros de contaminación a sumas y conteos por
+    (año, estacion_id, variable).
+
+    Es la única pasada sobre los datos horarios (lote a lote, desde
+    cargar_contaminacion): las Tareas 1 y 3A agregan después esta tabla
+    (unas pocas cientos de filas) en lugar de volver a agrupar los datos
+    completos. Como media = sum(valor) / count(valor), sumar sumas y
+    conteos da exactamente la misma media final.
+
+    En lugar de un groupby, cada combinación (año, estación, variable) se
+    codifica como un entero contiguo y sumas/conteos salen de np.bincount.
+    Mismo resultado que groupby(observed=True).agg(sum, count): ignora NaN
+    en valor y descarta filas con alguna clave nula.
+
+    Args:
+        df: Registros de contaminación (o un lote), ya filtrados a
+            calidad_dato == "ok"
+        años: Año de cada registro ya calculado (p. ej. con
+            pyarrow.compute.year); si es None se extrae de fecha_utc
+
+    Returns:
+        DataFrame con columnas: [año, estacion_id, variable, suma, n]
+    """
+    if años is None:
+        años = df["fecha_utc"].dt.year
+    codigos_año, años = pd.factorize(años)
+    estaciones = df["estacion_id"].astype("category")
+    variables = df["variable"].astype("category")
+    codigos_est = estaciones.cat.codes.to_numpy()
+    codigos_var = variables.cat.codes.to_numpy()
+    n_est = len(estaciones.cat.categories)
+    n_var = len(variables.cat.categories)
+
+    # Clave compuesta: (año * n_est + estación) * n_var + variable
+    clave = (codigos_año.astype(np.int64) * n_est + codigos_est) * n_var + codigos_var
+    n_claves = len(años) * n_est * n_var
+
+    con_clave = (codigos_año >= 0) & (codigos_est >= 0) & (codigos_var >= 0)
+    valores = df["valor"].to_numpy(dtype=np.float64)
+    con_valor = con_clave & ~np.isnan(valores)
+
+    sumas = np.bincount(clave[con_valor], weights=valores[con_valor], minlength=n_claves)
+    conteos = np.bincount(clave[con_valor], minlength=n_claves)
+    # Grupos presentes aunque todos sus valores sean NaN (n = 0)
+    presentes = np.flatnonzero(np.bincount(clave[con_clave], minlength=n_claves))
+
+    idx_año, resto = np.divmod(presentes, n_est * n_var)
+    idx_est, idx_var = np.divmod(resto, n_var)
+
+    return pd.DataFrame({
+        "año": años[idx_año],
+        "estacion_id": pd.Categorical.from_codes(idx_est, estaciones.cat.categories),
+        "variable": pd.Categorical.from_codes(idx_var, variables.cat.categories),
+        "suma": sumas[presentes],
+        "n": conteos[presentes],
+    })
 
-    return df
 
 # ==============================================================================
 # TAREA 1: MEDIAS ANUALES DE CONTAMINACIÓN POR BARRIO
@@ -227,15 +565,13 @@ def calcular_contaminacion_anual_barrio(
     Calcula medias anuales de contaminación por barrio y variable.
 
     Proceso:
-        1. Filtra solo registros con calidad_dato == "ok"
-        2. Extrae el año desde fecha_utc
-        3. Mapea estacion_id → barrio usando ESTACION_BARRIO_MAP
-        4. Agrupa por (año, barrio, variable)
-        5. Calcula: media_anual = sum(valor) / count(valor)
-        6. Añade n_registros para evaluar fiabilidad
+        1. Mapea estacion_id → barrio usando ESTACION_BARRIO_MAP
+        2. Agrupa por (año, barrio, variable) sumando sumas y conteos
+        3. Calcula: media_anual = sum(valor) / count(valor)
+        4. Añade n_registros para evaluar fiabilidad
 
     Args:
-        df: DataFrame de contaminación normalizada
+        df: Pre-agregado anual por estación (ver agregar_contaminacion_anual)
         logger: Logger configurado
 
     Returns:
@@ -246,48 +582,35 @@ def calcular_contaminacion_anual_barrio(
     logger.info("TAREA 1: Medias anuales de contaminación por barrio")
     logger.info("─" * 40)
 
-    # Paso 1: Filtrar solo datos válidos
-    df_ok = df[df["calidad_dato"] == "ok"].copy()
-    descartados = len(df) - len(df_ok)
-    logger.info(f"  Registros válidos (ok): {len(df_ok):,} / {len(df):,}")
-    if descartados > 0:
-        logger.info(f"  Descartados (invalid/missing): {descartados:,}")
-
-    if df_ok.empty:
-        logger.warning("  Sin datos válidos para calcular estadísticas")
-        return None
-
-    # Paso 2: Extraer año
-    # fecha_utc puede ser tz-aware (UTC) → extraemos .dt.year directamente
-    df_ok["año"] = df_ok["fecha_utc"].dt.year
+    # Paso 1: Mapear estacion_id → barrio (categórico)
+    barrio = mapear_barrios(df["estacion_id"])
 
-    # Paso 3: Mapear estacion_id → barrio
-    df_ok["barrio"] = df_ok["estacion_id"].map(ESTACION_BARRIO_MAP)
-
-    # Registrar estaciones sin mapeo (por si hay estaciones nuevas)
-    sin_barrio = df_ok[df_ok["barrio"].isna()]["estacion_id"].unique()
+    # Registrar estaciones sin mapeo (por si hay estaciones nuevas);
+    # groupby descarta sus filas (clave NaN)
+    sin_barrio = df.loc[barrio.isna(), "estacion_id"].unique()
     if len(sin_barrio) > 0:
         logger.warning(
             f"  Estaciones sin mapeo a barrio: {list(sin_barrio)}. "
             f"Se excluyen del cálculo. Actualiza ESTACION_BARRIO_MAP si es necesario."
         )
-        df_ok = df_ok.dropna(subset=["barrio"])
 
-    if df_ok.empty:
+    if barrio.isna().all():
         logger.warning("  Sin datos tras mapeo de barrios")
         return None
 
-    # Paso 4-5: Agrupar y calcular media
-    # media_anual = sum(valor) / count(valor) → equivalente a .mean()
+    # Paso 2-3: Agrupar y calcular media
+    # media_anual = sum(valor) / count(valor)
     # n_registros = count(valor) → para ponderar fiabilidad
+    # observed=True: solo combinaciones presentes (barrio es categórico)
+    # sort=False: el orden final lo fija el sort_values de abajo
     df_stats = (
-        df_ok
-        .groupby(["año", "barrio", "variable"], as_index=False)
-        .agg(
-            media_anual=("valor", "mean"),
-            n_registros=("valor", "count"),
-        )
+        df[["suma", "n"]]
+        .groupby([df["año"], barrio, df["variable"]], observed=True, sort=False)
+        .sum()
+        .reset_index()
+        .rename(columns={"n": "n_registros"})
     )
+    df_stats.insert(3, "media_anual", df_stats.pop("suma") / df_stats["n_registros"])
 
     # Añadir unidad (siempre µg/m³ para contaminación)
     df_stats["unidad"] = "µg/m³"
@@ -301,10 +624,11 @@ def calcular_contaminacion_anual_barrio(
     ).reset_index(drop=True)
 
     logger.info(f"  Resultado: {len(df_stats):,} filas")
-    logger.info(
-        f"  Años cubiertos: {df_stats['año'].min()} → {df_stats['año'].max()}")
-    logger.info(f"  Barrios: {sorted(df_stats['barrio'].unique())}")
-    logger.info(f"  Variables: {sorted(df_stats['variable'].unique())}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            f"  Años cubiertos: {df_stats['año'].min()} → {df_stats['año'].max()}")
+        logger.info(f"  Barrios: {sorted(df_stats['barrio'].unique())}")
+        logger.info(f"  Variables: {sorted(df_stats['variable'].unique())}")
 
     return df_stats
 
@@ -320,25 +644,24 @@ def calcular_precipitacion_mensual(
     """
     Calcula medias mensuales de precipitación.
 
+    Recibe la salida de cargar_meteorologia, que ya descarta los registros
+    que no son "ok" y las fechas NaT.
+
     Proceso:
-        1. Filtra solo registros con calidad_dato == "ok"
-        2. Descarta filas donde precipitacion_mm es NaN o fecha es NaT
-        3. Extrae año y mes desde fecha
-        4. Agrupa por (año, mes)
-        5. Calcula media mensual + n_registros
+        1. Descarta filas donde precipitacion_mm es NaN
+        2. Extrae año y mes desde fecha
+        3. Agrupa por (año, mes)
+        4. Calcula media mensual + n_registros
     """
     logger.info("")
     logger.info("─" * 40)
     logger.info("TAREA 2: Medias mensuales de precipitación")
     logger.info("─" * 40)
 
-    # Paso 1: Filtrar datos válidos
-    df_ok = df[df["calidad_dato"] == "ok"].copy()
-    logger.info(f"  Registros válidos (ok): {len(df_ok):,} / {len(df):,}")
-
-    # Paso 2: Descartar NaN en precipitación Y fechas inválidas (NaT)
-    df_precip = df_ok.dropna(subset=["precipitacion_mm", "fecha"]).copy()
-    logger.info(f"  Con precipitación y fecha válidas: {len(df_precip):,}")
+    # Paso 1: Descartar NaN en precipitación (solo las columnas usadas, sin
+    # .copy(): año y mes se pasan a groupby como Series sueltas)
+    df_precip = df.loc[df["precipitacion_mm"].notna(), ["fecha", "precipitacion_mm"]]
+    logger.info(f"  Con precipitación válida: {len(df_precip):,} / {len(df):,}")
 
     if df_precip.empty:
         logger.warning("  Sin datos de precipitación válidos")
@@ -350,18 +673,17 @@ def calcular_precipitacion_mensual(
             "  La columna 'fecha' no es de tipo datetime después de la limpieza")
         return None
 
-    # Paso 3: Extraer año y mes
-    df_precip["año"] = df_precip["fecha"].dt.year
-    df_precip["mes"] = df_precip["fecha"].dt.month
+    # Paso 2: Extraer año y mes (claves enteras estrechas: sin NaT desde la
+    # carga, int16/int8 bastan y el groupby recorre menos memoria)
+    año = df_precip["fecha"].dt.year.astype(np.int16).rename("año")
+    mes = df_precip["fecha"].dt.month.astype(np.int8).rename("mes")
 
-    # Paso 4-5: Agrupar y calcular
+    # Paso 3-4: Agrupar y calcular
     df_stats = (
-        df_precip
-        .groupby(["año", "mes"], as_index=False)
-        .agg(
-            precipitacion_media_mm=("precipitacion_mm", "mean"),
-            n_registros=("precipitacion_mm", "count"),
-        )
+        df_precip["precipitacion_mm"]
+        .groupby([año, mes], sort=False)  # se ordena abajo
+        .agg(precipitacion_media_mm="mean", n_registros="count")
+        .reset_index()
     )
 
     # Redondear
@@ -398,7 +720,8 @@ def calcular_tendencias_historicas(
     evolución temporal de Valencia.
 
     Args:
-        df_contam: DataFrame de contaminación normalizada (o None)
+        df_contam: Pre-agregado anual de contaminación por estación
+            (ver agregar_contaminacion_anual) (o None)
         df_meteo: DataFrame de meteorología normalizada (o None)
         logger: Logger configurado
 
@@ -416,34 +739,27 @@ def calcular_tendencias_historicas(
     if df_contam is not None:
         logger.info("  3A: Procesando contaminación...")
 
-        df_ok = df_contam[df_contam["calidad_dato"] == "ok"].copy()
-        df_ok["año"] = df_ok["fecha_utc"].dt.year
-
         # Pivotar: una columna por variable (NO2, O3, PM10, etc.)
         # Para cada (año, variable): media de todos los valores válidos
         contam_anual = (
-            df_ok
-            .groupby(["año", "variable"], as_index=False)
-            .agg(
-                media=("valor", "mean"),
-                n=("valor", "count"),
-            )
+            df_contam
+            .groupby(["año", "variable"], as_index=False,
+                     observed=True, sort=False)[["suma", "n"]]
+            .sum()
         )
+        contam_anual["media"] = contam_anual["suma"] / contam_anual["n"]
 
-        # Pivotar a formato ancho: año | NO2_media | NO2_n | O3_media | ...
-        pivot_media = contam_anual.pivot(
-            index="año", columns="variable", values="media"
-        )
-        pivot_n = contam_anual.pivot(
-            index="año", columns="variable", values="n"
+        # Pivotar a formato ancho en una sola pasada (media y n a la vez):
+        # año | NO2_ugm3 | O3_ugm3 | ... | NO2_n_registros | ...
+        contam_wide = contam_anual.pivot(
+            index="año", columns="variable", values=["media", "n"]
         )
 
         # Renombrar columnas: NO2 → NO2_ugm3, para claridad
-        pivot_media.columns = [f"{col}_ugm3" for col in pivot_media.columns]
-        pivot_n.columns = [f"{col}_n_registros" for col in pivot_n.columns]
-
-        # Unir media + n_registros
-        contam_wide = pd.concat([pivot_media, pivot_n], axis=1)
+        contam_wide.columns = [
+            f"{col}_ugm3" if valor == "media" else f"{col}_n_registros"
+            for valor, col in contam_wide.columns
+        ]
         contam_wide = contam_wide.round(2)
 
         frames.append(contam_wide)
@@ -453,29 +769,40 @@ def calcular_tendencias_historicas(
     if df_meteo is not None:
         logger.info("  3B: Procesando meteorología...")
 
-        df_ok = df_meteo[df_meteo["calidad_dato"] == "ok"].copy()
-        df_ok["año"] = df_ok["fecha"].dt.year
-
-        # Calcular medias anuales para cada variable meteorológica
-        meteo_stats = []
-
-        for col, nombre_salida in [
-            ("temp_c", "temp_media_c"),
-            ("precipitacion_mm", "precipitacion_media_mm"),
-            ("humedad_pct", "humedad_media_pct"),
-        ]:
-            if col not in df_ok.columns:
-                continue
-
-            serie = df_ok.dropna(subset=[col]).groupby("año")[col]
-            media = serie.mean().rename(nombre_salida)
-            n = serie.count().rename(
-                f"{nombre_salida.replace('media_', '').replace('_media', '')}_n_registros")
-
-            meteo_stats.extend([media, n])
-
-        if meteo_stats:
-            meteo_wide = pd.concat(meteo_stats, axis=1).round(2)
+        # Medias anuales de todas las variables meteorológicas en una sola
+        # pasada groupby-agg (mean/count ya ignoran NaN por columna)
+        columnas_meteo = {
+            "temp_c": "temp_media_c",
+            "precipitacion_mm": "precipitacion_media_mm",
+            "humedad_pct": "humedad_media_pct",
+        }
+        columnas_meteo = {col: nombre for col, nombre in columnas_meteo.items()
+                          if col in df_meteo.columns}
+
+        if columnas_meteo:
+            # df_meteo ya viene filtrado a "ok" desde la carga; el año va a
+            # groupby como Series suelta
+            año = df_meteo["fecha"].dt.year.rename("año")
+
+            agg = df_meteo.groupby(año, sort=False)[list(columnas_meteo)].agg(["mean", "count"])
+
+            # Años sin ningún valor de una variable → NaN (no count = 0),
+            # y fuera los años sin datos de ninguna variable
+            for col in columnas_meteo:
+                sin_datos = agg[(col, "count")] == 0
+                agg.loc[sin_datos, [(col, "mean"), (col, "count")]] = np.nan
+            agg = agg.dropna(how="all")
+
+            # Aplanar a: temp_media_c | temp_c_n_registros | ...
+            nombres = []
+            for col, estadistico in agg.columns:
+                nombre = columnas_meteo[col]
+                if estadistico == "count":
+                    nombre = f"{nombre.replace('media_', '').replace('_media', '')}_n_registros"
+                nombres.append(nombre)
+            agg.columns = nombres
+
+            meteo_wide = agg.round(2)
             frames.append(meteo_wide)
             logger.info(f"  → Meteorología: {len(meteo_wide)} años")
 
@@ -511,7 +838,10 @@ def guardar_csv(
     descripcion: str
 ) -> bool:
     """
-    Guarda un DataFrame como CSV con encoding UTF-8.
+    Guarda un DataFrame como CSV con encoding UTF-8 (con BOM, para Excel).
+
+    Con pyarrow disponible el CSV se codifica desde C++ y se escribe además
+    una copia .parquet junto al CSV; sin pyarrow se usa pandas.to_csv.
 
     Args:
         df: DataFrame a guardar
@@ -523,7 +853,15 @@ def guardar_csv(
         True si se guardó correctamente, False si hubo error.
     """
     try:
-        df.to_csv(path, index=False, encoding="utf-8-sig")
+        if PYARROW_DISPONIBLE:
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            with open(path, "wb") as f:
+                f.write("\ufeff".encode("utf-8"))  # BOM, igual que utf-8-sig
+                pa_csv.write_csv(tabla, f)
+            pq.write_table(tabla, path.with_suffix(".parquet"),
+                           compression="zstd")
+        else:
+            df.to_csv(path, index=False, encoding="utf-8-sig")
         logger.info(f"  ✔ Guardado [{descripcion}]: {path}")
         logger.info(f"    → {len(df):,} filas, {len(df.columns)} columnas")
         return True
@@ -555,20 +893,21 @@ def imprimir_resumen(
         logger.info("")
         logger.info("  📊 Contaminación media anual por barrio:")
         logger.info(f"     Filas: {len(df_contam_barrio):,}")
-        logger.info(f"     Años: {df_contam_barrio['año'].min()} → "
-                    f"{df_contam_barrio['año'].max()}")
-        logger.info(
-            f"     Barrios: {sorted(df_contam_barrio['barrio'].unique())}")
-        logger.info(
-            f"     Variables: {sorted(df_contam_barrio['variable'].unique())}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"     Años: {df_contam_barrio['año'].min()} → "
+                        f"{df_contam_barrio['año'].max()}")
+            logger.info(
+                f"     Barrios: {sorted(df_contam_barrio['barrio'].unique())}")
+            logger.info(
+                f"     Variables: {sorted(df_contam_barrio['variable'].unique())}")
 
         # Top 3 combinaciones con más registros
         top = df_contam_barrio.nlargest(3, "n_registros")
-        for _, row in top.iterrows():
+        for row in top.itertuples(index=False):
             logger.info(
-                f"     Top: {row['barrio']}/{row['variable']} "
-                f"({row['año']}): {row['media_anual']:.1f} µg/m³ "
-                f"(n={row['n_registros']:,})"
+                f"     Top: {row.barrio}/{row.variable} "
+                f"({row.año}): {row.media_anual:.1f} µg/m³ "
+                f"(n={row.n_registros:,})"
             )
     else:
         logger.warning("  📊 Contaminación anual por barrio: NO GENERADO")
@@ -582,8 +921,8 @@ def imprimir_resumen(
                     f"{df_precip_mensual['año'].max()}/{df_precip_mensual['mes'].max():02d}")
 
         # Mes más lluvioso global
-        mes_max = df_precip_mensual.loc[
-            df_precip_mensual["precipitacion_media_mm"].idxmax()
+        mes_max = df_precip_mensual.iloc[
+            df_precip_mensual["precipitacion_media_mm"].to_numpy().argmax()
         ]
         logger.info(
             f"     Más lluvioso: {int(mes_max['año'])}/{int(mes_max['mes']):02d} "
@@ -641,11 +980,17 @@ def main():
     logger.info("CARGA DE DATOS")
     logger.info("─" * 40)
 
-    df_contam = cargar_contaminacion(logger)
-    df_meteo = cargar_meteorologia(logger)
+    # Las dos cargas son independientes y casi todo su tiempo es E/S y
+    # decodificación en pyarrow (que libera el GIL): se solapan en hilos
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futuro_contam = pool.submit(cargar_contaminacion, logger)
+        futuro_meteo = pool.submit(cargar_meteorologia, logger)
+        df_contam_anual = futuro_contam.result()
+        df_meteo = futuro_meteo.result()
 
-    if df_contam is None and df_meteo is None:
+    if df_contam_anual is None and df_meteo is None:
         logger.error("No hay datos de ninguna fuente. Abortando.")
+        detener_logging()
         print("\n❌ ERROR: No se encontraron datos. Revisa las fases 5.1 y 5.2.")
         return
 
@@ -653,10 +998,10 @@ def main():
     # PASO 2: Tarea 1 - Contaminación anual por barrio
     # ------------------------------------------------------------------
     df_contam_barrio = None
-    if df_contam is not None:
+    if df_contam_anual is not None:
         logger.info("")
         df_contam_barrio = calcular_contaminacion_anual_barrio(
-            df_contam, logger)
+            df_contam_anual, logger)
 
     # ------------------------------------------------------------------
     # PASO 3: Tarea 2 - Precipitación mensual
@@ -668,7 +1013,8 @@ def main():
     # ------------------------------------------------------------------
     # PASO 4: Tarea 3 - Tendencias históricas
     # ------------------------------------------------------------------
-    df_tendencias = calcular_tendencias_historicas(df_contam, df_meteo, logger)
+    df_tendencias = calcular_tendencias_historicas(
+        df_contam_anual, df_meteo, logger)
 
     # ------------------------------------------------------------------
     # PASO 5: Guardar resultados
@@ -700,6 +1046,7 @@ def main():
     # ------------------------------------------------------------------
     imprimir_resumen(df_contam_barrio, df_precip_mensual,
                      df_tendencias, logger)
+    detener_logging()
 
     # Mensaje final consola
     print(f"\n✅ ESTADÍSTICAS COMPLETADAS: {guardados}/3 ficheros generados")
@@ -36,6 +36,7 @@ Archivos de entrada:
 
 Archivo de salida:
     3.DATOS_LIMPIOS/impacto_eventos.csv
+    3.DATOS_LIMPIOS/impacto_eventos.parquet  (copia tipada, si hay pyarrow)
 
 Ruta esperada del script:
     2.SCRIPTS/procesamiento/correlacion_eventos.py
@@ -56,7 +57,13 @@ import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+try:
+    import pyarrow  # noqa: F401  (necesario para Feather)
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
 
 
 # ==============================================================================
@@ -73,6 +80,12 @@ METEOROLOGIA_PATH = PROJECT_ROOT / "3.DATOS_LIMPIOS" / "meteorologia_limpio.csv"
 EVENTOS_PATH = PROJECT_ROOT / "1.DATOS_EN_CRUDO" / \
     "eventos" / "eventos_clasificados.json"
 
+# Columnas de contaminación usadas en el análisis (el resto no se lee)
+COLUMNAS_CONTAMINACION = ["fecha_utc", "variable", "valor", "calidad_dato"]
+
+# --- Caché de lecturas CSV (Feather, clave = ruta + mtime + tamaño) ---
+CACHE_DIR = PROJECT_ROOT / "3.DATOS_LIMPIOS" / "cache"
+
 # --- Archivo de salida ---
 OUTPUT_DIR = PROJECT_ROOT / "3.DATOS_LIMPIOS"
 OUTPUT_FILE = OUTPUT_DIR / "impacto_eventos.csv"
@@ -83,6 +96,10 @@ LOG_DIR = PROJECT_ROOT / "logs"
 # --- Umbrales ---
 PRECIPITACION_UMBRAL_MM = 5.0  # Días con >5mm se excluyen del baseline
 
+# --- Columnas fijas de la tabla diaria del cruce con eventos (después
+# van las variables de contaminación) ---
+COLUMNAS_DIARIAS = ["temp_media", "precip_media", "n_incidencias"]
+
 # --- Timezone ---
 TZ_LOCAL = "Europe/Madrid"
 
@@ -126,6 +143,65 @@ def setup_logging() -> logging.Logger:
 # CARGA DE DATOS
 # ==============================================================================
 
+def _cached_load(
+    src: Path,
+    loader: Callable[[], pd.DataFrame],
+    logger: logging.Logger
+) -> pd.DataFrame:
+    """
+    Devuelve `loader()` memorizado en disco como Feather.
+
+    La clave se deriva de la ruta, mtime y tamaño de `src`: si el CSV
+    cambia se genera una caché nueva y las antiguas se borran. Sin
+    pyarrow, o si la caché no se puede leer/escribir, se llama a
+    `loader()` directamente.
+    """
+    if not PYARROW_DISPONIBLE:
+        return loader()
+
+    stat = src.stat()
+    key = hashlib.blake2b(
+        f"{src}:{stat.st_mtime}:{stat.st_size}".encode()).hexdigest()[:16]
+    path = CACHE_DIR / f"{src.stem}.{key}.feather"
+
+    if path.exists():
+        try:
+            df = pd.read_feather(path)
+            logger.info(f"      (caché Feather: {path.name})")
+            return df
+        except Exception as e:
+            logger.warning(f"      ⚠ Caché ilegible, se regenera: {e}")
+
+    df = loader()
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for antigua in CACHE_DIR.glob(f"{src.stem}.*.feather"):
+            antigua.unlink(missing_ok=True)
+        path_tmp = path.with_suffix(".feather.tmp")
+        df.reset_index(drop=True).to_feather(path_tmp)
+        path_tmp.replace(path)
+    except Exception as e:
+        logger.warning(f"      ⚠ No se pudo guardar la caché {path.name}: {e}")
+    return df
+
+
+def _read_meteo_csv(logger: logging.Logger) -> pd.DataFrame:
+    """Lee el CSV de meteorología y descarta las fechas no parseables."""
+    # Cargar sin parsear fechas primero
+    df_meteo = pd.read_csv(METEOROLOGIA_PATH)
+
+    # Conversión robusta de fechas con ISO8601 (maneja microsegundos)
+    df_meteo["fecha"] = pd.to_datetime(
+        df_meteo["fecha"], format='ISO8601', utc=True, errors='coerce')
+
+    fechas_invalidas = df_meteo["fecha"].isna().sum()
+    if fechas_invalidas > 0:
+        logger.warning(
+            f"      ⚠ {fechas_invalidas:,} fechas inválidas encontradas")
+        df_meteo = df_meteo.dropna(subset=["fecha"])
+    return df_meteo
+
+
 def load_data(logger: logging.Logger) -> Tuple[
     Optional[pd.DataFrame],
     Optional[pd.DataFrame],
@@ -152,7 +228,22 @@ def load_data(logger: logging.Logger) -> Tuple[
     logger.info(f"  1A: Contaminación → {CONTAMINACION_PATH.name}")
     if CONTAMINACION_PATH.exists():
         try:
-            df_contam = pd.read_parquet(CONTAMINACION_PATH)
+            # Proyección + filtro empujados al lector Parquet. Con pyarrow,
+            # las columnas de texto se leen como diccionario Arrow (category
+            # en pandas): sin un str de Python por fila; las numéricas y
+            # fechas siguen en NumPy para bincount/searchsorted
+            opciones_arrow = {}
+            if PYARROW_DISPONIBLE:
+                opciones_arrow = {
+                    "engine": "pyarrow",
+                    "read_dictionary": ["variable", "calidad_dato"],
+                }
+            df_contam = pd.read_parquet(
+                CONTAMINACION_PATH,
+                columns=COLUMNAS_CONTAMINACION,
+                filters=[("calidad_dato", "==", "ok")],
+                **opciones_arrow,
+            )
             logger.info(f"      ✓ {len(df_contam):,} registros cargados")
             logger.info(f"      Columnas: {list(df_contam.columns)}")
             logger.info(
@@ -168,7 +259,11 @@ def load_data(logger: logging.Logger) -> Tuple[
     logger.info(f"  1B: Tráfico → {TRAFICO_PATH.name}")
     if TRAFICO_PATH.exists():
         try:
-            df_trafico = pd.read_csv(TRAFICO_PATH, parse_dates=["fecha"])
+            df_trafico = _cached_load(
+                TRAFICO_PATH,
+                lambda: pd.read_csv(TRAFICO_PATH, parse_dates=["fecha"]),
+                logger,
+            )
             logger.info(f"      ✓ {len(df_trafico):,} registros cargados")
             logger.info(f"      Columnas: {list(df_trafico.columns)}")
         except Exception as e:
@@ -180,18 +275,8 @@ def load_data(logger: logging.Logger) -> Tuple[
     logger.info(f"  1C: Meteorología → {METEOROLOGIA_PATH.name}")
     if METEOROLOGIA_PATH.exists():
         try:
-            # Cargar sin parsear fechas primero
-            df_meteo = pd.read_csv(METEOROLOGIA_PATH)
-
-            # Conversión robusta de fechas con ISO8601 (maneja microsegundos)
-            df_meteo["fecha"] = pd.to_datetime(
-                df_meteo["fecha"], format='ISO8601', utc=True, errors='coerce')
-
-            fechas_invalidas = df_meteo["fecha"].isna().sum()
-            if fechas_invalidas > 0:
-                logger.warning(
-                    f"      ⚠ {fechas_invalidas:,} fechas inválidas encontradas")
-                df_meteo = df_meteo.dropna(subset=["fecha"])
+            df_meteo = _cached_load(
+                METEOROLOGIA_PATH, lambda: _read_meteo_csv(logger), logger)
 
             logger.info(f"      ✓ {len(df_meteo):,} registros cargados")
             logger.info(f"      Columnas: {list(df_meteo.columns)}")
@@ -220,6 +305,44 @@ def load_data(logger: logging.Logger) -> Tuple[
 # PREPARACIÓN DE DATOS (AGREGACIONES DIARIAS)
 # ==============================================================================
 
+def _utc_days(fechas: pd.Series) -> np.ndarray:
+    """Día UTC (datetime64[D], NaT si falta) de una serie datetime con zona."""
+    return fechas.dt.tz_convert(None).to_numpy().astype("datetime64[D]")
+
+
+def _days_to_datetime(dias: np.ndarray) -> np.ndarray:
+    """Días desde 1970-01-01 (int64) → datetime64[ns] a medianoche."""
+    return dias.astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def _group_mean_count(
+    codigos: np.ndarray,
+    n_grupos: int,
+    valores: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media y número de valores no NaN por grupo con np.bincount: mismo
+    resultado que groupby(...).agg(["mean", "count"]) (media NaN si el
+    grupo no tiene valores), en dos pasadas sobre arrays contiguos.
+
+    Args:
+        codigos: Código de grupo de cada fila (0..n_grupos-1, p. ej. de
+            pd.factorize)
+        n_grupos: Número de grupos
+        valores: Valores float de cada fila
+
+    Returns:
+        Tupla (medias, conteos), un elemento por grupo
+    """
+    con_valor = ~np.isnan(valores)
+    sumas = np.bincount(
+        codigos[con_valor], weights=valores[con_valor], minlength=n_grupos)
+    conteos = np.bincount(codigos[con_valor], minlength=n_grupos)
+    with np.errstate(invalid="ignore"):
+        medias = sumas / conteos
+    return medias, conteos
+
+
 def build_daily_aggregations(
     df_contam: Optional[pd.DataFrame],
     df_trafico: Optional[pd.DataFrame],
@@ -230,10 +353,18 @@ def build_daily_aggregations(
     Agrega los datos al nivel DIARIO para poder cruzarlos con las ventanas
     de eventos.
 
+    El día de cada registro es su fecha UTC como datetime64[D] (aritmética
+    entera, sin crear un datetime.date por fila). Cada clave de grupo
+    (día, o día × variable) se codifica como un entero, se factoriza y las
+    medias/conteos salen de np.bincount (ver _group_mean_count), sin copiar
+    los DataFrames de entrada. Los resultados no se ordenan: los cruces
+    con eventos no dependen del orden de las filas.
+
     Returns:
         Tupla: (contam_diaria, trafico_diario, meteo_diaria)
-        Cada uno es un DataFrame con 'fecha' (date) como columna,
-        o None si los datos de entrada no estaban disponibles.
+        Cada uno es un DataFrame con 'fecha' (datetime a medianoche, sin
+        zona) como columna, o None si los datos de entrada no estaban
+        disponibles.
     """
     logger.info("")
     logger.info("─" * 40)
@@ -246,28 +377,40 @@ def build_daily_aggregations(
 
     # ─── 2A: Contaminación diaria ───
     # Esquema entrada: fecha_utc, variable, valor, calidad_dato
-    # Salida: fecha (date) | variable | valor_medio | n_registros
+    # Salida: fecha (día) | variable | valor_medio | n_registros
     if df_contam is not None and not df_contam.empty:
         logger.info("  2A: Agregando contaminación a nivel diario...")
 
-        df_ok = df_contam[df_contam["calidad_dato"] == "ok"].copy()
+        mask_ok = df_contam["calidad_dato"] == "ok"
         logger.info(
-            f"      Registros con calidad='ok': {len(df_ok):,} de {len(df_contam):,}")
+            f"      Registros con calidad='ok': {mask_ok.sum():,} de {len(df_contam):,}")
 
-        # Asegurar datetime y extraer fecha (date)
-        df_ok["fecha_utc"] = pd.to_datetime(df_ok["fecha_utc"], utc=True)
-        df_ok["fecha"] = df_ok["fecha_utc"].dt.date
+        # Asegurar datetime y extraer el día (UTC)
+        dias = _utc_days(
+            pd.to_datetime(df_contam.loc[mask_ok, "fecha_utc"], utc=True))
+        variables = df_contam.loc[mask_ok, "variable"].astype("category")
+        codigos_var = variables.cat.codes.to_numpy()
+        n_var = len(variables.cat.categories)
+        valores = df_contam.loc[mask_ok, "valor"].to_numpy(dtype=np.float64)
 
         # Agrupar: media diaria por variable (promedio de todas las estaciones)
-        contam_diaria = (
-            df_ok
-            .groupby(["fecha", "variable"], as_index=False)
-            .agg(
-                valor_medio=("valor", "mean"),
-                n_registros=("valor", "count"),
-            )
-        )
-        contam_diaria["fecha"] = pd.to_datetime(contam_diaria["fecha"])
+        # Clave: día * n_var + variable (sin filas con día o variable nulos)
+        validas = ~np.isnat(dias) & (codigos_var >= 0)
+        clave = dias[validas].view(np.int64) * n_var + codigos_var[validas]
+        codigos, claves = pd.factorize(clave)
+        medias, conteos = _group_mean_count(
+            codigos, len(claves), valores[validas])
+
+        dia_clave, var_clave = np.divmod(claves, n_var)
+        contam_diaria = pd.DataFrame({
+            "fecha": _days_to_datetime(dia_clave),
+            # category: el cruce con eventos y los groupby posteriores
+            # trabajan sobre los códigos enteros
+            "variable": pd.Categorical.from_codes(
+                var_clave, variables.cat.categories),
+            "valor_medio": medias,
+            "n_registros": conteos,
+        })
 
         logger.info(
             f"      ✓ {len(contam_diaria):,} filas "
@@ -279,22 +422,18 @@ def build_daily_aggregations(
 
     # ─── 2B: Tráfico diario ───
     # Esquema entrada: fecha, incidencias, calidad_dato
-    # Salida: fecha (date) | n_incidencias
+    # Salida: fecha (día) | n_incidencias
     if df_trafico is not None and not df_trafico.empty:
         logger.info("  2B: Agregando tráfico a nivel diario...")
 
-        df_traf = df_trafico.copy()
-        df_traf["fecha"] = pd.to_datetime(df_traf["fecha"], utc=True)
-        df_traf["fecha_dia"] = df_traf["fecha"].dt.date
+        dias = _utc_days(pd.to_datetime(df_trafico["fecha"], utc=True))
 
         # Contar incidencias por día
-        trafico_diario = (
-            df_traf
-            .groupby("fecha_dia", as_index=False)
-            .agg(n_incidencias=("fecha", "count"))
-        )
-        trafico_diario.rename(columns={"fecha_dia": "fecha"}, inplace=True)
-        trafico_diario["fecha"] = pd.to_datetime(trafico_diario["fecha"])
+        codigos, claves = pd.factorize(dias[~np.isnat(dias)].view(np.int64))
+        trafico_diario = pd.DataFrame({
+            "fecha": _days_to_datetime(claves),
+            "n_incidencias": np.bincount(codigos, minlength=len(claves)),
+        })
 
         logger.info(
             f"      ✓ {len(trafico_diario):,} días con datos de tráfico"
@@ -304,39 +443,43 @@ def build_daily_aggregations(
 
       # ─── 2C: Meteorología diaria ───
     # Esquema entrada: fecha, precipitacion_mm, temp_c, humedad_pct
-    # Salida: fecha (date) | precip_media | temp_media
+    # Salida: fecha (día) | precip_media | temp_media
     if df_meteo is not None and not df_meteo.empty:
         logger.info("  2C: Agregando meteorología a nivel diario...")
 
-        df_met = df_meteo.copy()
-
-        # Conversión robusta de fecha con formato ISO8601 (maneja microsegundos)
-        try:
-            df_met["fecha"] = pd.to_datetime(
-                df_met["fecha"], format='ISO8601', utc=True)
-        except ValueError:
-            # Fallback: intentar con formato mixed si ISO8601 falla
-            df_met["fecha"] = pd.to_datetime(
-                df_met["fecha"], format='mixed', utc=True, errors='coerce')
-            fechas_invalidas = df_met["fecha"].isna().sum()
-            if fechas_invalidas > 0:
-                logger.warning(
-                    f"      ⚠ {fechas_invalidas:,} fechas inválidas convertidas a NaT")
-                df_met = df_met.dropna(subset=["fecha"])
-
-        # Extraer fecha del día (date)
-        df_met["fecha_dia"] = df_met["fecha"].dt.date
-
-        meteo_diaria = (
-            df_met
-            .groupby("fecha_dia", as_index=False)
-            .agg(
-                precip_media=("precipitacion_mm", "mean"),
-                temp_media=("temp_c", "mean"),
-            )
-        )
-        meteo_diaria.rename(columns={"fecha_dia": "fecha"}, inplace=True)
-        meteo_diaria["fecha"] = pd.to_datetime(meteo_diaria["fecha"])
+        # load_data ya entrega 'fecha' como datetime UTC: solo se parsea si
+        # llega como texto, en una única pasada (format='mixed' admite
+        # ISO8601 con o sin microsegundos; cache=True parsea cada valor
+        # repetido una sola vez)
+        if pd.api.types.is_datetime64_any_dtype(df_meteo["fecha"]):
+            fecha = pd.to_datetime(df_meteo["fecha"], utc=True)
+        else:
+            fecha = pd.to_datetime(
+                df_meteo["fecha"], format='mixed', utc=True, errors='coerce',
+                cache=True)
+        fechas_invalidas = fecha.isna().sum()
+        if fechas_invalidas > 0:
+            # Las filas NaT se descartan al agrupar: no hace falta dropna
+            logger.warning(
+                f"      ⚠ {fechas_invalidas:,} fechas inválidas convertidas a NaT")
+
+        # Día (UTC) de cada registro; los mismos códigos de grupo para
+        # precipitación y temperatura
+        dias = _utc_days(fecha)
+        validas = ~np.isnat(dias)
+        codigos, claves = pd.factorize(dias[validas].view(np.int64))
+        precip_media, _ = _group_mean_count(
+            codigos, len(claves),
+            df_meteo["precipitacion_mm"].to_numpy(dtype=np.float64)[validas])
+        temp_media, _ = _group_mean_count(
+            codigos, len(claves),
+            df_meteo["temp_c"].to_numpy(dtype=np.float64)[validas])
+
+        meteo_diaria = pd.DataFrame({
+            "fecha": _days_to_datetime(claves),
+            "precip_media": precip_media,
+            "temp_media": temp_media,
+        })
 
         logger.info(
             f"      ✓ {len(meteo_diaria):,} días con datos meteorológicos"
@@ -351,33 +494,32 @@ def build_daily_aggregations(
 # PARSING Y DEDUPLICACIÓN DE EVENTOS
 # ==============================================================================
 
-def _parse_event_date(date_str: str) -> Optional[pd.Timestamp]:
+def _parse_event_dates(values: List[Any]) -> pd.DatetimeIndex:
     """
-    Intenta parsear una fecha de evento con múltiples formatos.
+    Parsea de una vez las fechas de todos los eventos (una sola llamada a
+    pd.to_datetime en lugar de una por fecha).
     Los eventos pueden traer formatos variados:
       - "2026-03-15"
       - "15/03/2026"
       - "2026-03-15T20:00:00"
       - etc.
 
+    format='mixed' infiere el formato de cada elemento por separado: las
+    fechas ISO se leen como año-mes-día y dayfirst solo se aplica a las
+    ambiguas tipo "15/03/2026". Las fechas con zona se pasan a UTC y se
+    les quita la zona (trabajamos a nivel date).
+
     Returns:
-        pd.Timestamp (tz-naive) o None si no se puede parsear.
+        pd.DatetimeIndex tz-naive alineado con `values` (NaT si no se
+        puede parsear o no es un string no vacío).
     """
-    if not date_str or not isinstance(date_str, str):
-        return None
-
-    date_str = date_str.strip()
-    if not date_str:
-        return None
-
-    try:
-        ts = pd.to_datetime(date_str, dayfirst=True)
-        # Quitar timezone si la tiene (trabajamos a nivel date)
-        if ts.tzinfo is not None:
-            ts = ts.tz_convert("UTC").tz_localize(None)
-        return ts
-    except Exception:
-        return None
+    limpios = [
+        v.strip() if isinstance(v, str) and v.strip() else None
+        for v in values
+    ]
+    return pd.to_datetime(
+        limpios, dayfirst=True, format="mixed", utc=True, errors="coerce"
+    ).tz_localize(None)
 
 
 def _generate_event_id(evento: Dict[str, Any]) -> str:
@@ -389,7 +531,8 @@ def _generate_event_id(evento: Dict[str, Any]) -> str:
     fecha_ini = evento.get("fecha_inicio", "")
     fuente = evento.get("fuente", "")
     raw = f"{nombre}|{fecha_ini}|{fuente}"
-    return hashlib.md5(raw.encode("utf-8")).hexdigest()[:12]
+    # 6 bytes = 12 caracteres hex, sin calcular y truncar un MD5 completo
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=6).hexdigest()
 
 
 def parse_and_deduplicate_events(
@@ -420,21 +563,29 @@ def parse_and_deduplicate_events(
     skipped_no_date = 0
     skipped_malformed = 0
 
-    for evento in eventos_raw:
+    # Parsear todas las fechas en bloque (NaT si no son válidas; los
+    # eventos que no son dict se cuentan abajo como malformados)
+    fechas_inicio = _parse_event_dates(
+        [evento.get("fecha_inicio") if isinstance(evento, dict) else None
+         for evento in eventos_raw])
+    fechas_fin = _parse_event_dates(
+        [evento.get("fecha_fin") if isinstance(evento, dict) else None
+         for evento in eventos_raw])
+
+    for evento, fecha_inicio, fecha_fin in zip(
+            eventos_raw, fechas_inicio, fechas_fin):
         try:
             # Nombre: visitvalencia/ayuntamiento usan "nombre", valenciacf usa "rival"
             nombre = evento.get("nombre", evento.get(
                 "rival", "Evento desconocido"))
 
-            # Parsear fechas
-            fecha_inicio = _parse_event_date(evento.get("fecha_inicio", ""))
-            if fecha_inicio is None:
+            # Fechas ya parseadas
+            if pd.isna(fecha_inicio):
                 skipped_no_date += 1
                 logger.debug(f"    Saltado (sin fecha): {nombre}")
                 continue
 
-            fecha_fin = _parse_event_date(evento.get("fecha_fin", ""))
-            if fecha_fin is None:
+            if pd.isna(fecha_fin):
                 # Evento de un solo día
                 fecha_fin = fecha_inicio
 
@@ -486,90 +637,161 @@ def parse_and_deduplicate_events(
 # CONSTRUCCIÓN DEL BASELINE
 # ==============================================================================
 
-def _get_all_event_dates(events: List[Dict[str, Any]]) -> set:
+def _event_days(evento: Dict[str, Any]) -> np.ndarray:
     """
-    Construye el conjunto de TODAS las fechas cubiertas por algún evento.
-    Se usa para excluir del baseline días que coinciden con otros eventos.
+    Días (datetime64[D]) cubiertos por un evento: los mismos que
+    pd.date_range(fecha_inicio, fecha_fin, freq="D"), sin crear Timestamps.
+    """
+    start = evento["fecha_inicio"]
+    n_dias = (evento["fecha_fin"] - start) // pd.Timedelta(days=1) + 1
+    return start.to_datetime64().astype("datetime64[D]") + np.arange(n_dias)
 
-    Returns:
-        Set de datetime.date
+
+def _in_sorted(valores: np.ndarray, ordenados: np.ndarray) -> np.ndarray:
     """
-    all_dates = set()
-    for ev in events:
-        start = ev["fecha_inicio"]
-        end = ev["fecha_fin"]
-        rango = pd.date_range(start, end, freq="D")
-        for d in rango:
-            all_dates.add(d.date())
-    return all_dates
-
-
-def _build_baseline_mask(
-    fechas_serie: pd.Series,
-    evento: Dict[str, Any],
-    all_event_dates: set,
-    meteo_diaria: Optional[pd.DataFrame],
-    logger: logging.Logger,
-) -> pd.Index:
+    Pertenencia de cada elemento de `valores` a `ordenados` (array ya
+    ordenado, p. ej. días datetime64[D]) con searchsorted: una búsqueda
+    binaria por elemento, sin ordenar ni crear objetos date.
     """
-    Construye la máscara booleana que identifica días válidos para el baseline
-    de un evento concreto.
+    if len(ordenados) == 0:
+        return np.zeros(len(valores), dtype=bool)
+    idx = np.searchsorted(ordenados, valores).clip(max=len(ordenados) - 1)
+    return ordenados[idx] == valores
 
-    Criterios (todos deben cumplirse):
-      1. Mismo mes que algún día del evento
-      2. Mismo día de la semana que algún día del evento
-      3. No solaparse con NINGÚN otro evento
-      4. No ser día de lluvia significativa (>5mm)
 
-    Args:
-        fechas_serie: Serie pd.DatetimeIndex con las fechas disponibles
-        evento: Dict del evento con fecha_inicio/fecha_fin
-        all_event_dates: Conjunto de todas las fechas con eventos
-        meteo_diaria: DataFrame con 'fecha' y 'precip_media'
-        logger: Logger
+def _get_all_event_dates(events: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Construye el conjunto de TODAS las fechas cubiertas por algún evento.
+    Se usa para excluir del baseline días que coinciden con otros eventos.
 
     Returns:
-        pd.Index con las posiciones de los días baseline
+        np.ndarray datetime64[D] ordenado y sin repetidos (apto para
+        _in_sorted)
     """
-    start = evento["fecha_inicio"]
-    end = evento["fecha_fin"]
-    event_range = pd.date_range(start, end, freq="D")
+    if not events:
+        return np.array([], dtype="datetime64[D]")
+    return np.unique(np.concatenate([_event_days(ev) for ev in events]))
 
-    # Meses del evento
-    event_months = set(d.month for d in event_range)
 
-    # Días de la semana del evento (0=Mon, 6=Sun)
-    event_weekdays = set(d.dayofweek for d in event_range)
+def _months_weekdays(dias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mes (1-12) y día de la semana (0=Mon, 6=Sun) de cada día
+    (datetime64[D]), con aritmética entera.
+    """
+    meses = dias.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    # El 1970-01-01 (día 0) fue jueves
+    dias_semana = (dias.astype(np.int64) + 3) % 7
+    return meses, dias_semana
 
-    # Fechas del propio evento (para excluir del baseline)
-    event_dates_self = set(d.date() for d in event_range)
 
-    # Criterio 1: mismo mes
-    mask_month = fechas_serie.dt.month.isin(event_months)
+def _month_weekday_code(meses: np.ndarray, dias_semana: np.ndarray) -> np.ndarray:
+    """
+    Empaqueta mes (1-12) y día de la semana (0-6) en un único código
+    0-83, para resolver los criterios 1 y 2 del baseline con una sola
+    comparación.
+    """
+    return (np.asarray(meses, dtype=np.int64) - 1) * 7 + dias_semana
 
-    # Criterio 2: mismo día de la semana
-    mask_weekday = fechas_serie.dt.dayofweek.isin(event_weekdays)
 
-    # Criterio 3: no solaparse con ningún evento
-    mask_no_event = ~fechas_serie.dt.date.isin(all_event_dates)
+def _event_months_weekdays(
+    dias_evento: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Meses (1-12) y días de la semana (0=Mon, 6=Sun) distintos de los días
+    de un evento (datetime64[D]).
+    """
+    meses, dias_semana = _months_weekdays(dias_evento)
+    return np.unique(meses), np.unique(dias_semana)
 
-    # Criterio 4: no lluvia significativa
-    mask_no_rain = pd.Series(True, index=fechas_serie.index)
-    if meteo_diaria is not None and not meteo_diaria.empty:
-        # Crear lookup: fecha → precip_media
-        meteo_lookup = meteo_diaria.set_index(
-            meteo_diaria["fecha"].dt.date
-        )["precip_media"]
 
-        precip_values = fechas_serie.dt.date.map(meteo_lookup)
-        # Días sin dato meteorológico se consideran "no lluvia" (NaN ≤ 5 → True)
-        mask_no_rain = (precip_values.isna()) | (
-            precip_values <= PRECIPITACION_UMBRAL_MM)
+def _daily_matrix(
+    contam_diaria: Optional[pd.DataFrame],
+    trafico_diario: Optional[pd.DataFrame],
+    meteo_diaria: Optional[pd.DataFrame],
+    variables: List[str],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Une las series diarias en una tabla ancha con un día por fila (la
+    unión de los días de todas las series), para cruzarla con los eventos
+    en una sola pasada.
 
-    # Combinar todos los criterios
-    mask_final = mask_month & mask_weekday & mask_no_event & mask_no_rain
+    Columnas: COLUMNAS_DIARIAS y después una por variable de
+    contaminación, en el orden de `variables`.
 
-    return mask_final
+    Returns:
+        Tupla (dias, valores, presentes):
+          - dias: datetime64[D] ordenado y sin repetidos
+          - valores: float64 (días × columnas), NaN si la serie no tiene
+            ese día
+          - presentes: bool (días × columnas), la serie tiene fila ese día
+            (aunque su valor sea NaN)
+    """
+    # (días, columna/s, valores) de cada serie
+    fuentes = []
+    if meteo_diaria is not None and not meteo_diaria.empty:
+        dias_meteo = meteo_diaria["fecha"].to_numpy().astype("datetime64[D]")
+        fuentes.append((dias_meteo, 0, meteo_diaria["temp_media"]))
+        fuentes.append((dias_meteo, 1, meteo_diaria["precip_media"]))
+    if trafico_diario is not None and not trafico_diario.empty:
+        fuentes.append((
+            trafico_diario["fecha"].to_numpy().astype("datetime64[D]"),
+            2,
+            trafico_diario["n_incidencias"],
+        ))
+    if variables:
+        codigos_var = pd.Categorical(
+            contam_diaria["variable"], categories=variables).codes
+        fuentes.append((
+            contam_diaria["fecha"].to_numpy().astype("datetime64[D]"),
+            len(COLUMNAS_DIARIAS) + codigos_var,
+            contam_diaria["valor_medio"],
+        ))
+
+    if fuentes:
+        dias = np.unique(np.concatenate([f[0] for f in fuentes]))
+    else:
+        dias = np.array([], dtype="datetime64[D]")
+    n_columnas = len(COLUMNAS_DIARIAS) + len(variables)
+    valores = np.full((len(dias), n_columnas), np.nan)
+    presentes = np.zeros((len(dias), n_columnas), dtype=bool)
+    for dias_serie, columna, serie in fuentes:
+        filas = np.searchsorted(dias, dias_serie)
+        valores[filas, columna] = serie.to_numpy(dtype=np.float64)
+        presentes[filas, columna] = True
+    return dias, valores, presentes
+
+
+def _window_stats(
+    eventos: np.ndarray,
+    filas: np.ndarray,
+    valores: np.ndarray,
+    presentes: np.ndarray,
+    n_eventos: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Medias y días con dato de cada columna de la tabla diaria, por evento,
+    sobre los pares (evento, fila de día) de una ventana (días del evento
+    o de su baseline). Todas las columnas se agregan a la vez: el grupo
+    de cada celda es evento × columna.
+
+    Args:
+        eventos: Posición del evento de cada par
+        filas: Fila de la tabla diaria de cada par
+        valores, presentes: Tabla diaria (ver _daily_matrix)
+        n_eventos: Número de eventos
+
+    Returns:
+        Tupla (medias, n_dias), arrays (eventos × columnas); media NaN y
+        0 días si la serie no tiene datos en la ventana
+    """
+    n_columnas = valores.shape[1]
+    codigos = (eventos[:, None] * n_columnas + np.arange(n_columnas)).ravel()
+    n_grupos = n_eventos * n_columnas
+    medias, _ = _group_mean_count(codigos, n_grupos, valores[filas].ravel())
+    n_dias = np.bincount(
+        codigos[presentes[filas].ravel()], minlength=n_grupos)
+    return (medias.reshape(n_eventos, n_columnas),
+            n_dias.reshape(n_eventos, n_columnas))
 
 
 # ==============================================================================
@@ -587,6 +809,21 @@ def compute_event_impact(
     Para cada evento, calcula el impacto en contaminación y tráfico
     comparando con el baseline.
 
+    Meteorología, tráfico y contaminación se cruzan juntos: las series
+    diarias se unen en una tabla ancha por día (_daily_matrix), los
+    eventos se expanden a pares (evento, día) para la ventana del evento
+    y para la del baseline, y cada ventana se agrega en una sola pasada
+    (_window_stats).
+
+    Baseline de un evento: días que cumplen todos los criterios
+      1. Mismo mes que algún día del evento
+      2. Mismo día de la semana que algún día del evento
+      3. No solaparse con NINGÚN otro evento
+      4. No ser día de lluvia significativa (>5mm)
+    Los criterios 3 y 4 no dependen del evento y se evalúan una vez por
+    día; los criterios 1 y 2 se resuelven con un merge por el código
+    (mes, día de la semana) contra los pares de cada evento.
+
     Returns:
         DataFrame con una fila por (evento × variable_contaminante),
         más el impacto de tráfico incluido en cada fila.
@@ -611,222 +848,144 @@ def compute_event_impact(
         variables_contam = sorted(contam_diaria["variable"].unique())
         logger.info(f"  Variables de contaminación: {variables_contam}")
 
-    results = []
-    eventos_procesados = 0
-    eventos_saltados = 0
-
-    for i, evento in enumerate(events):
-        nombre = evento["nombre"][:50]
-        start = evento["fecha_inicio"]
-        end = evento["fecha_fin"]
-        event_range = pd.date_range(start, end, freq="D")
-        event_dates = set(d.date() for d in event_range)
-        n_dias_evento = len(event_dates)
-
-        logger.debug(
-            f"  [{i+1}/{len(events)}] {nombre} "
-            f"({start.date()} → {end.date()}, {n_dias_evento}d)"
+    # Tabla diaria: temp, precip, incidencias y una columna por variable
+    dias, valores, presentes = _daily_matrix(
+        contam_diaria, trafico_diario, meteo_diaria, variables_contam)
+
+    # Criterios 3 y 4 del baseline, por día. Días sin dato meteorológico
+    # se consideran "no lluvia"
+    precip = valores[:, COLUMNAS_DIARIAS.index("precip_media")]
+    elegible = (~_in_sorted(dias, all_event_dates)
+                & (np.isnan(precip) | (precip <= PRECIPITACION_UMBRAL_MM)))
+
+    # --- Ventana del evento: un par (evento, día) por día con datos ---
+    n_eventos = len(events)
+    dias_eventos = [_event_days(ev) for ev in events]
+    n_dias_evento = np.array([len(d) for d in dias_eventos], dtype=np.int64)
+    dias_todos = np.concatenate(dias_eventos)
+    evento_de_dia = np.repeat(np.arange(n_eventos), n_dias_evento)
+    con_datos = _in_sorted(dias_todos, dias)
+    medias_ev, n_dias_ev = _window_stats(
+        evento_de_dia[con_datos],
+        np.searchsorted(dias, dias_todos[con_datos]),
+        valores, presentes, n_eventos)
+
+    # --- Ventana del baseline: pares (mes, día de la semana) de cada
+    # evento contra los días elegibles ---
+    pares = []
+    for pos, dias_evento in enumerate(dias_eventos):
+        meses, dias_semana = _event_months_weekdays(dias_evento)
+        pares.append(pd.DataFrame({
+            "evento": pos,
+            "mes_semana": _month_weekday_code(
+                meses[:, None], dias_semana).ravel(),
+        }))
+    filas_elegibles = np.flatnonzero(elegible)
+    cruce = pd.DataFrame({
+        "fila": filas_elegibles,
+        "mes_semana": _month_weekday_code(
+            *_months_weekdays(dias[filas_elegibles])),
+    }).merge(pd.concat(pares, ignore_index=True), on="mes_semana")
+    medias_bl, n_dias_bl_var = _window_stats(
+        cruce["evento"].to_numpy(), cruce["fila"].to_numpy(),
+        valores, presentes, n_eventos)
+
+    # Fechas como texto una sola vez: para la salida y el log de depuración
+    fecha_inicio_str = np.asarray(
+        [ev["fecha_inicio"].strftime("%Y-%m-%d") for ev in events], dtype=object)
+    fecha_fin_str = np.asarray(
+        [ev["fecha_fin"].strftime("%Y-%m-%d") for ev in events], dtype=object)
+
+    # El f-string por evento solo se construye si DEBUG está activo
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, evento in enumerate(events):
+            logger.debug(
+                f"  [{i+1}/{n_eventos}] {evento['nombre'][:50]} "
+                f"({fecha_inicio_str[i]} → {fecha_fin_str[i]}, "
+                f"{n_dias_evento[i]}d)"
+            )
+
+    # Columnas por evento de la tabla diaria
+    columna = {c: i for i, c in enumerate(COLUMNAS_DIARIAS)}
+    media_temp_evento = medias_ev[:, columna["temp_media"]]
+    media_temp_baseline = medias_bl[:, columna["temp_media"]]
+    media_precip_evento = medias_ev[:, columna["precip_media"]]
+    media_precip_baseline = medias_bl[:, columna["precip_media"]]
+    media_traf_evento = medias_ev[:, columna["n_incidencias"]]
+    media_traf_baseline = medias_bl[:, columna["n_incidencias"]]
+
+    # Impacto en tráfico (NaN si falta algún lado o el baseline es 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        impacto_trafico_pct = np.where(
+            media_traf_baseline > 0,
+            (media_traf_evento - media_traf_baseline) / media_traf_baseline * 100,
+            np.nan,
         )
 
-        # === METEOROLOGÍA del evento y baseline ===
-        media_temp_evento = np.nan
-        media_precip_evento = np.nan
-        media_temp_baseline = np.nan
-        media_precip_baseline = np.nan
-
-        if meteo_diaria is not None and not meteo_diaria.empty:
-            # Meteo durante el evento
-            mask_ev_meteo = meteo_diaria["fecha"].dt.date.isin(event_dates)
-            meteo_ev = meteo_diaria[mask_ev_meteo]
-
-            if not meteo_ev.empty:
-                media_temp_evento = meteo_ev["temp_media"].mean()
-                media_precip_evento = meteo_ev["precip_media"].mean()
-
-            # Meteo baseline
-            mask_bl_meteo = _build_baseline_mask(
-                meteo_diaria["fecha"],
-                evento,
-                all_event_dates,
-                meteo_diaria,
-                logger,
-            )
-            meteo_bl = meteo_diaria[mask_bl_meteo]
-
-            if not meteo_bl.empty:
-                media_temp_baseline = meteo_bl["temp_media"].mean()
-                media_precip_baseline = meteo_bl["precip_media"].mean()
-
-        # === TRÁFICO ===
-        impacto_trafico_pct = np.nan
-
-        if trafico_diario is not None and not trafico_diario.empty:
-            # Tráfico durante el evento
-            mask_ev_traf = trafico_diario["fecha"].dt.date.isin(event_dates)
-            traf_ev = trafico_diario[mask_ev_traf]
-            media_traf_evento = traf_ev["n_incidencias"].mean(
-            ) if not traf_ev.empty else np.nan
-
-            # Tráfico baseline
-            mask_bl_traf = _build_baseline_mask(
-                trafico_diario["fecha"],
-                evento,
-                all_event_dates,
-                meteo_diaria,
-                logger,
+    # === Construcción por columnas: una fila por (evento × variable) ===
+    if variables_contam:
+        # Contaminación: todas las variables para cada evento (columnas
+        # de la tabla diaria tras COLUMNAS_DIARIAS, en orden evento-variable)
+        n_var = len(variables_contam)
+        idx_evento = np.repeat(np.arange(n_eventos), n_var)
+        variable = pd.Categorical.from_codes(
+            np.tile(np.arange(n_var), n_eventos), variables_contam)
+        contam = slice(len(COLUMNAS_DIARIAS), None)
+        media_evento = medias_ev[:, contam].ravel()
+        media_baseline = medias_bl[:, contam].ravel()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            impacto_pct = np.where(
+                media_baseline > 0,
+                (media_evento - media_baseline) / media_baseline * 100,
+                np.nan,
             )
-            traf_bl = trafico_diario[mask_bl_traf]
-            media_traf_baseline = traf_bl["n_incidencias"].mean(
-            ) if not traf_bl.empty else np.nan
-
-            if (
-                not np.isnan(media_traf_evento)
-                and not np.isnan(media_traf_baseline)
-                and media_traf_baseline > 0
-            ):
-                impacto_trafico_pct = (
-                    (media_traf_evento - media_traf_baseline)
-                    / media_traf_baseline * 100
-                )
-
-        # === CONTAMINACIÓN (una fila por variable) ===
-        if variables_contam:
-            tiene_datos = False
-
-            for variable in variables_contam:
-                # Filtrar por variable
-                df_var = contam_diaria[contam_diaria["variable"] == variable]
-
-                if df_var.empty:
-                    continue
-
-                # Datos durante el evento
-                mask_ev = df_var["fecha"].dt.date.isin(event_dates)
-                datos_ev = df_var[mask_ev]
-                media_evento_val = (
-                    datos_ev["valor_medio"].mean(
-                    ) if not datos_ev.empty else np.nan
-                )
-                n_dias_ev_real = datos_ev["fecha"].nunique(
-                ) if not datos_ev.empty else 0
-
-                # Baseline
-                mask_bl = _build_baseline_mask(
-                    df_var["fecha"],
-                    evento,
-                    all_event_dates,
-                    meteo_diaria,
-                    logger,
-                )
-                datos_bl = df_var[mask_bl]
-                media_baseline_val = (
-                    datos_bl["valor_medio"].mean(
-                    ) if not datos_bl.empty else np.nan
-                )
-                n_dias_bl = datos_bl["fecha"].nunique(
-                ) if not datos_bl.empty else 0
-
-                # Calcular impacto
-                impacto_pct = np.nan
-                if (
-                    not np.isnan(media_evento_val)
-                    and not np.isnan(media_baseline_val)
-                    and media_baseline_val > 0
-                ):
-                    impacto_pct = (
-                        (media_evento_val - media_baseline_val)
-                        / media_baseline_val * 100
-                    )
-
-                results.append({
-                    "evento_id": evento["evento_id"],
-                    "nombre_evento": evento["nombre"],
-                    "tipo_evento": evento["tipo_evento"],
-                    "impacto_esperado": evento["impacto_esperado"],
-                    "fecha_inicio": start.strftime("%Y-%m-%d"),
-                    "fecha_fin": end.strftime("%Y-%m-%d"),
-                    "variable": variable,
-                    "media_evento": round(media_evento_val, 2) if not np.isnan(media_evento_val) else np.nan,
-                    "media_baseline": round(media_baseline_val, 2) if not np.isnan(media_baseline_val) else np.nan,
-                    "impacto_pct": round(impacto_pct, 2) if not np.isnan(impacto_pct) else np.nan,
-                    "n_dias_evento": n_dias_ev_real,
-                    "n_dias_baseline": n_dias_bl,
-                    "media_temp_evento": round(media_temp_evento, 1) if not np.isnan(media_temp_evento) else np.nan,
-                    "media_temp_baseline": round(media_temp_baseline, 1) if not np.isnan(media_temp_baseline) else np.nan,
-                    "media_precip_evento": round(media_precip_evento, 2) if not np.isnan(media_precip_evento) else np.nan,
-                    "media_precip_baseline": round(media_precip_baseline, 2) if not np.isnan(media_precip_baseline) else np.nan,
-                    "impacto_trafico_pct": round(impacto_trafico_pct, 2) if not np.isnan(impacto_trafico_pct) else np.nan,
-                })
-                tiene_datos = True
-
-            if tiene_datos:
-                eventos_procesados += 1
-            else:
-                eventos_saltados += 1
-                logger.debug(
-                    f"    → Saltado: sin datos de contaminación para sus fechas")
-
-        else:
-            # Sin datos de contaminación: generar fila solo con tráfico
-            results.append({
-                "evento_id": evento["evento_id"],
-                "nombre_evento": evento["nombre"],
-                "tipo_evento": evento["tipo_evento"],
-                "impacto_esperado": evento["impacto_esperado"],
-                "fecha_inicio": start.strftime("%Y-%m-%d"),
-                "fecha_fin": end.strftime("%Y-%m-%d"),
-                "variable": "sin_datos",
-                "media_evento": np.nan,
-                "media_baseline": np.nan,
-                "impacto_pct": np.nan,
-                "n_dias_evento": n_dias_evento,
-                "n_dias_baseline": 0,
-                "media_temp_evento": round(media_temp_evento, 1) if not np.isnan(media_temp_evento) else np.nan,
-                "media_temp_baseline": round(media_temp_baseline, 1) if not np.isnan(media_temp_baseline) else np.nan,
-                "media_precip_evento": round(media_precip_evento, 2) if not np.isnan(media_precip_evento) else np.nan,
-                "media_precip_baseline": round(media_precip_baseline, 2) if not np.isnan(media_precip_baseline) else np.nan,
-                "impacto_trafico_pct": round(impacto_trafico_pct, 2) if not np.isnan(impacto_trafico_pct) else np.nan,
-            })
+        n_dias_ev_real = n_dias_ev[:, contam].ravel()
+        n_dias_bl = n_dias_bl_var[:, contam].ravel()
 
-            if not np.isnan(impacto_trafico_pct):
-                eventos_procesados += 1
-            else:
-                eventos_saltados += 1
+        eventos_procesados = n_eventos
+    else:
+        # Sin datos de contaminación: una fila por evento solo con tráfico
+        idx_evento = np.arange(n_eventos)
+        variable = pd.Categorical.from_codes(
+            np.zeros(n_eventos, dtype=np.int64), ["sin_datos"])
+        media_evento = media_baseline = impacto_pct = np.full(n_eventos, np.nan)
+        n_dias_ev_real = n_dias_evento
+        n_dias_bl = np.zeros(n_eventos, dtype=np.int64)
+
+        eventos_procesados = int((~np.isnan(impacto_trafico_pct)).sum())
+    eventos_saltados = n_eventos - eventos_procesados
+
+    def por_evento(campo: str) -> np.ndarray:
+        return np.asarray([ev[campo] for ev in events], dtype=object)[idx_evento]
+
+    def por_evento_cat(campo: str) -> pd.Categorical:
+        # Pocas categorías repetidas en muchas filas: se codifican una vez
+        # por evento y se expanden los códigos
+        return pd.Categorical([ev[campo] for ev in events]).take(idx_evento)
+
+    df_results = pd.DataFrame({
+        "evento_id": por_evento("evento_id"),
+        "nombre_evento": por_evento("nombre"),
+        "tipo_evento": por_evento_cat("tipo_evento"),
+        "impacto_esperado": por_evento_cat("impacto_esperado"),
+        "fecha_inicio": fecha_inicio_str[idx_evento],
+        "fecha_fin": fecha_fin_str[idx_evento],
+        "variable": variable,
+        "media_evento": np.round(media_evento, 2),
+        "media_baseline": np.round(media_baseline, 2),
+        "impacto_pct": np.round(impacto_pct, 2),
+        "n_dias_evento": n_dias_ev_real,
+        "n_dias_baseline": n_dias_bl,
+        "media_temp_evento": np.round(media_temp_evento, 1)[idx_evento],
+        "media_temp_baseline": np.round(media_temp_baseline, 1)[idx_evento],
+        "media_precip_evento": np.round(media_precip_evento, 2)[idx_evento],
+        "media_precip_baseline": np.round(media_precip_baseline, 2)[idx_evento],
+        "impacto_trafico_pct": np.round(impacto_trafico_pct, 2)[idx_evento],
+    })
 
     logger.info(f"  Eventos procesados con datos: {eventos_procesados}")
     logger.info(f"  Eventos saltados (sin datos): {eventos_saltados}")
-    logger.info(f"  Filas de resultado generadas: {len(results)}")
-
-    if not results:
-        return pd.DataFrame()
-
-    df_results = pd.DataFrame(results)
-
-    # Asegurar orden de columnas
-    columnas_output = [
-        "evento_id",
-        "nombre_evento",
-        "tipo_evento",
-        "impacto_esperado",
-        "fecha_inicio",
-        "fecha_fin",
-        "variable",
-        "media_evento",
-        "media_baseline",
-        "impacto_pct",
-        "n_dias_evento",
-        "n_dias_baseline",
-        "media_temp_evento",
-        "media_temp_baseline",
-        "media_precip_evento",
-        "media_precip_baseline",
-        "impacto_trafico_pct",
-    ]
-    for col in columnas_output:
-        if col not in df_results.columns:
-            df_results[col] = np.nan
-
-    df_results = df_results[columnas_output]
+    logger.info(f"  Filas de resultado generadas: {len(df_results)}")
 
     return df_results
 
@@ -842,6 +1001,9 @@ def save_results(
     """
     Guarda el DataFrame de resultados como CSV.
 
+    Con pyarrow disponible se escribe además una copia .parquet junto al
+    CSV, que se lee sin volver a parsear texto y conserva los tipos.
+
     Returns:
         Path al archivo guardado, o None si falla.
     """
@@ -862,11 +1024,24 @@ def save_results(
         logger.info(f"    Columnas: {list(df.columns)}")
         logger.info(
             f"    Tamaño:   {OUTPUT_FILE.stat().st_size / 1024:.1f} KB")
-        return OUTPUT_FILE
     except Exception as e:
         logger.error(f"  ✘ Error al guardar: {e}")
         return None
 
+    # La copia Parquet es opcional: si falla, el CSV ya está guardado
+    if PYARROW_DISPONIBLE:
+        parquet_path = OUTPUT_FILE.with_suffix(".parquet")
+        try:
+            df.to_parquet(parquet_path, engine="pyarrow",
+                          compression="zstd", index=False)
+            logger.info(
+                f"  ✓ Copia Parquet: {parquet_path} "
+                f"({parquet_path.stat().st_size / 1024:.1f} KB)")
+        except Exception as e:
+            logger.warning(f"  ⚠ No se pudo escribir la copia Parquet: {e}")
+
+    return OUTPUT_FILE
+
 
 # ==============================================================================
 # RESUMEN FINAL
@@ -902,27 +1077,39 @@ def print_summary(
     # Desglose por tipo de evento
     logger.info("")
     logger.info("  Por tipo de evento:")
-    for tipo, grupo in df.groupby("tipo_evento"):
-        n_ev = grupo["evento_id"].nunique()
+    # Claves category (ver compute_event_impact): groupby sobre los
+    # códigos enteros, no sobre str
+    eventos_por_tipo = (
+        df["evento_id"]
+        .groupby(df["tipo_evento"], observed=True)
+        .nunique()
+    )
+    for tipo, n_ev in eventos_por_tipo.items():
         logger.info(f"    {tipo:>12}: {n_ev} eventos")
 
     # Desglose por impacto esperado
     logger.info("")
     logger.info("  Por impacto esperado:")
-    for impacto, grupo in df.groupby("impacto_esperado"):
-        n_ev = grupo["evento_id"].nunique()
+    eventos_por_impacto = (
+        df["evento_id"]
+        .groupby(df["impacto_esperado"], observed=True)
+        .nunique()
+    )
+    for impacto, n_ev in eventos_por_impacto.items():
         logger.info(f"    {impacto:>12}: {n_ev} eventos")
 
     # Variables analizadas
     logger.info("")
     logger.info("  Variables analizadas:")
-    for var in sorted(df["variable"].unique()):
-        subset = df[df["variable"] == var]
-        n_valid = subset["impacto_pct"].notna().sum()
+    impacto_por_variable = (
+        df["impacto_pct"]
+        .groupby(df["variable"], observed=True)
+        .agg(["count", "mean"])
+    )
+    for var, (n_valid, media_impacto) in impacto_por_variable.iterrows():
         if n_valid > 0:
-            media_impacto = subset["impacto_pct"].mean()
             logger.info(
-                f"    {var:>10}: {n_valid} comparaciones válidas | "
+                f"    {var:>10}: {n_valid:.0f} comparaciones válidas | "
                 f"impacto medio = {media_impacto:+.1f}%"
             )
         else:
@@ -951,7 +1138,7 @@ def print_summary(
         logger.info("  Top 5 eventos con mayor impacto medio (contaminación):")
         top = (
             valid_impacto
-            .groupby(["evento_id", "nombre_evento"], as_index=False)
+            .groupby(["evento_id", "nombre_evento"], as_index=False, sort=False)
             .agg(impacto_medio=("impacto_pct", "mean"))
             .nlargest(5, "impacto_medio")
         )
@@ -20,7 +20,7 @@ Descripción:
       - Calculan el rango de años dinámicamente (sin hardcodear)
       - Usan paleta de colores accesible
       - Son interactivos (hover, zoom, pan)
-      - Se exportan como HTML autocontenido
+      - Se exportan como HTML que comparten un único plotly.min.js
 
 Datos de entrada:
     1. 3.DATOS_LIMPIOS/contaminacion_normalizada.parquet
@@ -32,6 +32,7 @@ Datos de salida:
     4.VISUALIZACIONES/graficos/evolucion_no2.html
     4.VISUALIZACIONES/graficos/precipitaciones_anuales.html
     4.VISUALIZACIONES/graficos/comparativa_estacional.html
+    4.VISUALIZACIONES/graficos/plotly.min.js (compartido por los HTML)
 
 Ruta esperada del script:
     2.SCRIPTS/procesamiento/generar_graficos.py
@@ -48,12 +49,19 @@ import logging
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+try:
+    import pyarrow  # noqa: F401  (motor CSV multihilo de pandas)
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
 
 # ==============================================================================
 # CONFIGURACIÓN
@@ -69,6 +77,13 @@ METEOROLOGIA_PATH = (
     PROJECT_ROOT / "3.DATOS_LIMPIOS" / "meteorologia_limpio.csv"
 )
 
+# Columnas de contaminación usadas por los gráficos (el resto no se lee)
+COLUMNAS_CONTAMINACION = [
+    "fecha_utc", "estacion_id", "variable", "valor", "calidad_dato",
+]
+# Columnas de texto con pocos valores distintos → category (códigos enteros)
+COLUMNAS_CATEGORICAS = ["estacion_id", "variable", "calidad_dato"]
+
 # --- Salida ---
 GRAFICOS_DIR = PROJECT_ROOT / "4.VISUALIZACIONES" / "graficos"
 
@@ -84,6 +99,7 @@ UE_NO2_ANUAL = 40.0
 # --- Definición de estaciones ---
 MESES_VERANO = [6, 7, 8]       # Junio, Julio, Agosto
 MESES_INVIERNO = [12, 1, 2]    # Diciembre, Enero, Febrero
+ESTACIONES = ["Verano", "Invierno"]  # Categorías (y orden en la leyenda)
 
 # --- Paleta accesible (colorblind-friendly) ---
 COLOR_NO2_LINE = "#D62728"       # Rojo ladrillo (línea principal)
@@ -131,22 +147,30 @@ def setup_logging() -> logging.Logger:
 # CARGA DE DATOS
 # ==============================================================================
 
-def load_contaminacion(logger: logging.Logger) -> Optional[pd.DataFrame]:
+def load_contaminacion(
+    logger: logging.Logger,
+    filters: Optional[List[Tuple[str, str, str]]] = None,
+) -> Optional[pd.DataFrame]:
     """
     Carga el Parquet normalizado de contaminación (Fase 5.1).
 
+    Solo se leen COLUMNAS_CONTAMINACION. Los `filters` (formato pyarrow,
+    p. ej. [("variable", "==", "NO2")]) se aplican en la lectura: los
+    row groups que no cumplen se descartan sin cargarse en memoria.
+
     Esquema esperado:
         fecha_utc (datetime64[ns, UTC])
-        estacion_id (str)
+        estacion_id (str)  → se carga como category
         estacion_nombre (str)
         fuente (str)
-        variable (str)  → NO2, O3, PM10, PM2.5, SO2, CO
+        variable (str)  → NO2, O3, PM10, PM2.5, SO2, CO (category)
         valor (float64)
         unidad (str)    → µg/m³
-        calidad_dato (str) → ok, invalid, missing
+        calidad_dato (str) → ok, invalid, missing (category)
 
     Returns:
-        DataFrame o None si el fichero no existe o está vacío.
+        DataFrame o None si el fichero no existe o está vacío (o ninguna
+        fila cumple los filtros).
     """
     logger.info(f"  Contaminación → {CONTAMINACION_PATH.name}")
 
@@ -158,18 +182,39 @@ def load_contaminacion(logger: logging.Logger) -> Optional[pd.DataFrame]:
         return None
 
     try:
-        df = pd.read_parquet(CONTAMINACION_PATH)
+        df = pd.read_parquet(
+            CONTAMINACION_PATH,
+            columns=COLUMNAS_CONTAMINACION,
+            filters=filters,
+        )
     except Exception as e:
         logger.error(f"      Error leyendo Parquet: {e}")
         return None
 
     if df.empty:
-        logger.warning("      Fichero vacío")
+        logger.warning(
+            "      Sin registros que cumplan los filtros" if filters
+            else "      Fichero vacío")
         return None
 
     # Asegurar que fecha_utc es datetime UTC
     df["fecha_utc"] = pd.to_datetime(df["fecha_utc"], utc=True)
 
+    # Texto repetitivo como category: los filtros comparan códigos enteros
+    # en lugar de una cadena por fila
+    for col in COLUMNAS_CATEGORICAS:
+        df[col] = df[col].astype("category")
+
+    # Sin fecha no hay año: estas filas ya quedaban fuera de los gráficos
+    fechas_invalidas = df["fecha_utc"].isna().sum()
+    if fechas_invalidas > 0:
+        logger.warning(f"      {fechas_invalidas:,} fechas inválidas descartadas")
+        df = df.dropna(subset=["fecha_utc"])
+
+    # Año y mes una sola vez (enteros pequeños), para todos los gráficos
+    df["year"] = df["fecha_utc"].dt.year.astype("int16")
+    df["month"] = df["fecha_utc"].dt.month.astype("int8")
+
     logger.info(f"      {len(df):,} registros cargados")
     logger.info(
         f"      Rango: {df['fecha_utc'].min().year} → "
@@ -180,6 +225,17 @@ def load_contaminacion(logger: logging.Logger) -> Optional[pd.DataFrame]:
     return df
 
 
+def load_contaminacion_no2(logger: logging.Logger) -> Optional[pd.DataFrame]:
+    """
+    Carga solo los registros de NO₂ con calidad "ok", los únicos que usan
+    los gráficos 1 y 3, filtrando en la lectura del Parquet.
+    """
+    return load_contaminacion(
+        logger,
+        filters=[("variable", "==", "NO2"), ("calidad_dato", "==", "ok")],
+    )
+
+
 def load_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
     """
     Carga el CSV normalizado de meteorología (Fase 5.2).
@@ -205,10 +261,20 @@ def load_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
         )
         return None
 
+    # Lector CSV de Arrow (multihilo) si está disponible; los tipos siguen
+    # siendo NumPy
+    opciones_csv = {"engine": "pyarrow"} if PYARROW_DISPONIBLE else {}
+
     try:
-        df = pd.read_csv(METEOROLOGIA_PATH)
-        # Parseo robusto de fecha (puede ser tz-aware o naïve)
-        df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce", utc=True)
+        df = pd.read_csv(
+            METEOROLOGIA_PATH,
+            dtype={"precipitacion_mm": "float64"},
+            **opciones_csv,
+        )
+        # Parseo robusto de fecha ISO8601 (puede ser tz-aware o naïve, con
+        # o sin microsegundos)
+        df["fecha"] = pd.to_datetime(
+            df["fecha"], format="ISO8601", errors="coerce", utc=True)
     except Exception as e:
         logger.error(f"      Error leyendo CSV: {e}")
         return None
@@ -217,6 +283,15 @@ def load_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
         logger.warning("      Fichero vacío")
         return None
 
+    # Sin fecha no hay año: estas filas ya quedaban fuera de los gráficos
+    fechas_invalidas = df["fecha"].isna().sum()
+    if fechas_invalidas > 0:
+        logger.warning(f"      {fechas_invalidas:,} fechas inválidas descartadas")
+        df = df.dropna(subset=["fecha"])
+
+    # Año una sola vez (entero pequeño)
+    df["year"] = df["fecha"].dt.year.astype("int16")
+
     logger.info(f"      {len(df):,} registros cargados")
     logger.info(
         f"      Rango: {df['fecha'].min()} → {df['fecha'].max()}"
@@ -229,14 +304,24 @@ def load_meteorologia(logger: logging.Logger) -> Optional[pd.DataFrame]:
 # UTILIDADES
 # ==============================================================================
 
-def _save_figure(fig: go.Figure, filename: str, logger: logging.Logger) -> Optional[Path]:
+def _save_figure(
+    fig: go.Figure,
+    filename: str,
+    logger: logging.Logger,
+    plotlyjs_mode: str = "directory",
+) -> Optional[Path]:
     """
-    Guarda una figura Plotly como HTML autocontenido.
+    Guarda una figura Plotly como HTML.
 
     Args:
         fig: Figura Plotly
         filename: Nombre del archivo (e.g., "evolucion_no2.html")
         logger: Logger
+        plotlyjs_mode: Cómo se referencia plotly.js:
+            "directory" → un único plotly.min.js compartido en GRAFICOS_DIR
+                          (Plotly lo copia la primera vez)
+            "cdn"       → <script> al CDN de Plotly (HTML de un solo archivo,
+                          requiere conexión para verse)
 
     Returns:
         Path al archivo guardado, o None si falla
@@ -247,7 +332,7 @@ def _save_figure(fig: go.Figure, filename: str, logger: logging.Logger) -> Optio
     try:
         fig.write_html(
             str(output_path),
-            include_plotlyjs=True,  # HTML autocontenido (sin CDN)
+            include_plotlyjs=plotlyjs_mode,  # Sin incrustar ~3.5 MB de JS por archivo
             full_html=True,
         )
         file_size_kb = output_path.stat().st_size / 1024
@@ -258,27 +343,85 @@ def _save_figure(fig: go.Figure, filename: str, logger: logging.Logger) -> Optio
         return None
 
 
+def _year_codes(year: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Código de grupo (0..n-1) de cada fila según su año, por desplazamiento
+    desde el año mínimo: sin ordenar ni hashear las filas.
+
+    Returns:
+        Tupla (codigos, years): código de cada fila y años presentes en
+        orden ascendente (years[codigos] == year)
+    """
+    offset = year.astype(np.int64) - year.min()
+    presentes = np.bincount(offset) > 0
+    remap = np.cumsum(presentes) - 1
+    years = (np.flatnonzero(presentes) + year.min()).astype(year.dtype)
+    return remap[offset], years
+
+
+def _group_sum_count(
+    codigos: np.ndarray,
+    n_grupos: int,
+    valores: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Suma y número de valores no NaN por grupo con np.bincount (mismo
+    resultado que groupby(...).agg(["sum", "count"])). Los valores se leen
+    como array contiguo en memoria (sin copia si ya lo son).
+    """
+    valores = np.ascontiguousarray(valores, dtype=np.float64)
+    con_valor = ~np.isnan(valores)
+    sumas = np.bincount(
+        codigos[con_valor], weights=valores[con_valor], minlength=n_grupos)
+    conteos = np.bincount(codigos[con_valor], minlength=n_grupos)
+    return sumas, conteos
+
+
+def _category_mask(serie: pd.Series, valor: str) -> np.ndarray:
+    """
+    Máscara serie == valor sobre una columna category: compara el código
+    entero de la categoría en lugar de las cadenas.
+    """
+    categorias = serie.cat.categories
+    if valor not in categorias:
+        return np.zeros(len(serie), dtype=bool)
+    return serie.cat.codes.to_numpy() == categorias.get_loc(valor)
+
+
+def _filter_no2_ok(df_contam: pd.DataFrame) -> pd.DataFrame:
+    """
+    Registros de NO₂ con calidad "ok" (columnas estacion_id, valor, year,
+    month): se calcula una vez y se pasa a los gráficos 1 y 3.
+    """
+    mask = (
+        _category_mask(df_contam["variable"], "NO2")
+        & _category_mask(df_contam["calidad_dato"], "ok")
+    )
+    return df_contam.loc[mask, ["estacion_id", "valor", "year", "month"]].copy()
+
+
 # ==============================================================================
 # GRÁFICO 1: EVOLUCIÓN ANUAL DE NO₂
 # ==============================================================================
 
 def generate_no2_evolution(
-    df_contam: pd.DataFrame,
+    df_no2: pd.DataFrame,
     logger: logging.Logger,
 ) -> Optional[Path]:
     """
     Genera un gráfico de línea con la evolución anual del NO₂ en Valencia.
 
     Proceso:
-    1. Filtra variable == "NO2" y calidad_dato == "ok"
-    2. Extrae año desde fecha_utc
+    1. Recibe los registros de NO₂ con calidad "ok" (ver _filter_no2_ok)
+    2. Usa el año precalculado en la carga (load_contaminacion)
     3. Calcula media anual a nivel ciudad (promedio de todas las estaciones)
     4. Incluye el nº de registros válidos por año como hover info
     5. Añade líneas de referencia OMS (10 µg/m³) y UE (40 µg/m³)
     6. Título dinámico con rango de años
 
     Args:
-        df_contam: DataFrame de contaminación normalizada
+        df_no2: Registros de NO₂ con calidad OK (compartido con el
+            gráfico 3: no se modifica)
         logger: Logger
 
     Returns:
@@ -289,30 +432,35 @@ def generate_no2_evolution(
     logger.info("GRÁFICO 1: Evolución anual NO₂")
     logger.info("─" * 40)
 
-    # --- 1. Filtrar NO₂ con calidad OK ---
-    df_no2 = df_contam[
-        (df_contam["variable"] == "NO2") &
-        (df_contam["calidad_dato"] == "ok")
-    ].copy()
-
+    # --- 1. Datos de NO₂ con calidad OK ---
     if df_no2.empty:
         logger.warning("      Sin datos de NO₂ con calidad OK")
         return None
 
-    # --- 2. Extraer año ---
-    df_no2["year"] = df_no2["fecha_utc"].dt.year
-
-    # --- 3. Media anual (ciudad) ---
-    no2_anual = (
-        df_no2
-        .groupby("year", as_index=False)
-        .agg(
-            media_no2=("valor", "mean"),
-            n_registros=("valor", "count"),
-            n_estaciones=("estacion_id", "nunique"),
-        )
-    )
-    no2_anual["media_no2"] = no2_anual["media_no2"].round(2)
+    # --- 2-3. Media anual (ciudad), con el año precalculado en la carga ---
+    # Clave entera pequeña: medias y conteos con np.bincount (años en
+    # orden ascendente, como necesita la línea)
+    codigos, years = _year_codes(df_no2["year"].to_numpy())
+    valor = df_no2["valor"].to_numpy(dtype=np.float64)
+    logger.debug(f"      valor C-contiguo: {valor.flags.c_contiguous}")
+    sumas, n_registros = _group_sum_count(codigos, len(years), valor)
+
+    # Estaciones distintas por año: pares (año, estación) únicos
+    codigos_est, estaciones = pd.factorize(df_no2["estacion_id"])
+    con_est = codigos_est >= 0
+    n_est = max(len(estaciones), 1)
+    pares = np.unique(
+        codigos[con_est].astype(np.int64) * n_est + codigos_est[con_est])
+    n_estaciones = np.bincount(pares // n_est, minlength=len(years))
+
+    with np.errstate(invalid="ignore"):
+        media_no2 = sumas / n_registros
+    no2_anual = pd.DataFrame({
+        "year": years,
+        "media_no2": media_no2.round(2),
+        "n_registros": n_registros,
+        "n_estaciones": n_estaciones,
+    })
 
     year_min = no2_anual["year"].min()
     year_max = no2_anual["year"].max()
@@ -417,7 +565,7 @@ def generate_precipitation_annual(
 
     Proceso:
     1. Filtra calidad_dato == "ok" y precipitacion_mm no nula
-    2. Extrae año desde fecha
+    2. Usa el año precalculado en la carga (load_meteorologia)
     3. Suma la precipitación por año
     4. Calcula media histórica como línea de referencia
     5. Colores dinámicos: barras por encima/debajo de la media
@@ -448,21 +596,19 @@ def generate_precipitation_annual(
         logger.warning("      Sin datos de precipitación válidos")
         return None
 
-    # --- 2. Extraer año ---
-    df["year"] = df["fecha"].dt.year
-
-    # --- 3. Agregar por año ---
-    # Precipitación se ACUMULA (suma), no se promedia
-    precip_anual = (
-        df
-        .groupby("year", as_index=False)
-        .agg(
-            precipitacion_total=("precipitacion_mm", "sum"),
-            n_registros=("precipitacion_mm", "count"),
-            n_dias_lluvia=("precipitacion_mm", lambda x: (x > 0).sum()),
-        )
-    )
-    precip_anual["precipitacion_total"] = precip_anual["precipitacion_total"].round(1)
+    # --- 2-3. Agregar por año (precalculado en la carga) ---
+    # Precipitación se ACUMULA (suma), no se promedia. Clave entera
+    # pequeña: sumas y conteos con np.bincount, años en orden ascendente
+    codigos, years = _year_codes(df["year"].to_numpy())
+    precip = df["precipitacion_mm"].to_numpy(dtype=np.float64)
+    precipitacion_total, n_registros = _group_sum_count(
+        codigos, len(years), precip)
+    precip_anual = pd.DataFrame({
+        "year": years,
+        "precipitacion_total": precipitacion_total.round(1),
+        "n_registros": n_registros,
+        "n_dias_lluvia": np.bincount(codigos[precip > 0], minlength=len(years)),
+    })
 
     year_min = precip_anual["year"].min()
     year_max = precip_anual["year"].max()
@@ -560,7 +706,7 @@ def generate_precipitation_annual(
 # ==============================================================================
 
 def generate_seasonal_comparison(
-    df_contam: pd.DataFrame,
+    df_no2: pd.DataFrame,
     logger: logging.Logger,
 ) -> Optional[Path]:
     """
@@ -583,7 +729,8 @@ def generate_seasonal_comparison(
     convención meteorológica estándar.
 
     Args:
-        df_contam: DataFrame de contaminación normalizada
+        df_no2: Registros de NO₂ con calidad OK (compartido con el
+            gráfico 1: no se modifica)
         logger: Logger
 
     Returns:
@@ -594,48 +741,36 @@ def generate_seasonal_comparison(
     logger.info("GRÁFICO 3: Comparativa estacional NO₂")
     logger.info("─" * 40)
 
-    # --- 1. Filtrar NO₂ con calidad OK ---
-    df_no2 = df_contam[
-        (df_contam["variable"] == "NO2") &
-        (df_contam["calidad_dato"] == "ok")
-    ].copy()
-
+    # --- 1. Datos de NO₂ con calidad OK ---
     if df_no2.empty:
         logger.warning("      Sin datos de NO₂ con calidad OK")
         return None
 
-    # --- 2. Extraer año y mes ---
-    df_no2["year"] = df_no2["fecha_utc"].dt.year
-    df_no2["month"] = df_no2["fecha_utc"].dt.month
+    # --- 2. Año y mes (precalculados en la carga) ---
+    year = df_no2["year"].to_numpy()
+    month = df_no2["month"].to_numpy()
 
     # --- 3. Asignar estación del año ---
     # Verano: meses 6, 7, 8 → pertenece al año calendario
     # Invierno: dic del año anterior + ene, feb del año actual
     #   → Convención meteorológica: dic 2024 + ene 2025 + feb 2025 = "Invierno 2025"
-    def _assign_season(row):
-        """Asigna estación y año estacional a una fila."""
-        m = row["month"]
-        y = row["year"]
-
-        if m in MESES_VERANO:
-            return pd.Series({"estacion": "Verano", "year_season": y})
-        elif m in [1, 2]:
-            # Enero y febrero → invierno del mismo año calendario
-            return pd.Series({"estacion": "Invierno", "year_season": y})
-        elif m == 12:
-            # Diciembre → invierno del año siguiente
-            return pd.Series({"estacion": "Invierno", "year_season": y + 1})
-        else:
-            # Meses de primavera/otoño → excluir
-            return pd.Series({"estacion": None, "year_season": None})
-
-    seasons = df_no2.apply(_assign_season, axis=1)
-    df_no2["estacion"] = seasons["estacion"]
-    df_no2["year_season"] = seasons["year_season"]
+    # Máscaras sobre los arrays de mes/año (sin apply por fila); la
+    # estación se guarda como category (códigos int8) con el orden de
+    # ESTACIONES
+    codigo_estacion = np.select(
+        [np.isin(month, MESES_VERANO), np.isin(month, MESES_INVIERNO)],
+        [ESTACIONES.index("Verano"), ESTACIONES.index("Invierno")],
+        default=-1,  # Meses de primavera/otoño → se excluyen
+    )
+    # Diciembre → invierno del año siguiente
+    year_season = (year + (month == 12)).astype(np.int32)
 
     # Filtrar solo verano e invierno
-    df_seasonal = df_no2[df_no2["estacion"].notna()].copy()
-    df_seasonal["year_season"] = df_seasonal["year_season"].astype(int)
+    en_estacion = codigo_estacion >= 0
+    df_seasonal = df_no2[en_estacion].copy()
+    df_seasonal["estacion"] = pd.Categorical.from_codes(
+        codigo_estacion[en_estacion], categories=ESTACIONES)
+    df_seasonal["year_season"] = year_season[en_estacion]
 
     if df_seasonal.empty:
         logger.warning("      Sin datos estacionales tras filtrar")
@@ -644,18 +779,21 @@ def generate_seasonal_comparison(
     # --- 4. Media estacional por año ---
     seasonal_means = (
         df_seasonal
-        .groupby(["year_season", "estacion"], as_index=False)
+        .groupby(["year_season", "estacion"], as_index=False, observed=True,
+                 sort=False)
         .agg(
             media_no2=("valor", "mean"),
             n_registros=("valor", "count"),
         )
+        # Orden de años y de ESTACIONES (orden de las barras y la leyenda)
+        .sort_values(["year_season", "estacion"], ignore_index=True)
     )
     seasonal_means["media_no2"] = seasonal_means["media_no2"].round(2)
 
     # Solo años con datos en AMBAS estaciones
     years_both = (
         seasonal_means
-        .groupby("year_season")["estacion"]
+        .groupby("year_season", sort=False)["estacion"]
         .nunique()
     )
     years_complete = years_both[years_both == 2].index
@@ -676,7 +814,7 @@ def generate_seasonal_comparison(
     )
 
     # Log de medias globales
-    for est in ["Verano", "Invierno"]:
+    for est in ESTACIONES:
         media = seasonal_means[
             seasonal_means["estacion"] == est
         ]["media_no2"].mean()
@@ -787,9 +925,12 @@ def main():
     logger.info("PASO 1: Carga de datos")
     logger.info("=" * 60)
 
-    df_contam = load_contaminacion(logger)
+    df_contam = load_contaminacion_no2(logger)
     df_meteo = load_meteorologia(logger)
 
+    # NO₂ con calidad OK, común a los gráficos 1 y 3
+    df_no2 = _filter_no2_ok(df_contam) if df_contam is not None else None
+
     # Verificar que tenemos al menos algo
     if df_contam is None and df_meteo is None:
         logger.error("Sin datos de entrada. Abortando.")
@@ -804,7 +945,7 @@ def main():
 
     # Gráfico 1: NO₂
     if df_contam is not None:
-        result = generate_no2_evolution(df_contam, logger)
+        result = generate_no2_evolution(df_no2, logger)
         if result:
             graficos_generados.append(result.name)
         else:
@@ -826,7 +967,7 @@ def main():
 
     # Gráfico 3: Estacional
     if df_contam is not None:
-        result = generate_seasonal_comparison(df_contam, logger)
+        result = generate_seasonal_comparison(df_no2, logger)
         if result:
             graficos_generados.append(result.name)
         else: